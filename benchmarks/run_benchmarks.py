@@ -0,0 +1,248 @@
+"""Benchmarks for the engine, Account and strategies.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--filter NAME] [--output FILE]
+
+Results are written as json so runs on different commits can be compared.
+--quick shrinks every case so the suite runs headless in CI in seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # never open a window
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)  # Adding the above directory to the path
+
+from gemini_modules import dataset, engine, exchange
+
+ASSETS = ["BTC", "DOGE", "ETH", "LTC", "XRP"]
+
+# Accounts purged per repetition of the purge_positions case
+PURGE_ACCOUNTS = 10
+
+
+def synthetic(bars, seed=0):
+    """Geometric random walk HLOCV frame with 30 minute bars."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.005, bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.002, bars)) * close
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=bars, freq="30min"),
+        "low": np.minimum(open_, close) - spread,
+        "high": np.maximum(open_, close) + spread,
+        "open": open_,
+        "close": close,
+        "volume": rng.lognormal(10, 1, bars),
+    })
+
+
+def bundled(asset, bars=None):
+    df = dataset.load(os.path.join(ROOT, "data", "USDT_{0}.csv".format(asset)))
+    return df if bars is None else df[:bars]
+
+
+def measure(func, repeat):
+    """Best and median wall time of func over repeat runs.
+
+    func may be a (prepare, run) pair instead, prepare is then called
+    untimed before every run and its result passed to run, for cases whose
+    run uses up its input.
+    """
+    prepare, run = func if isinstance(func, tuple) else (None, func)
+    times = []
+    for _ in range(repeat):
+        args = () if prepare is None else (prepare(),)
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+# Cases --------------------------------------------------------------------
+# Each case is (name, group, bars, setup) where setup returns the function
+# to time, or a (prepare, run) pair, see measure, so data loading and
+# strategy construction are not measured.
+
+def fixed_window_case(df, width=145, vectorized=False):
+    from momentum_algo import FixedWindowAlgo
+
+    def setup():
+        backtest = engine.backtest(df)
+        if vectorized:
+            return lambda: backtest.start_vectorized(
+                100, FixedWindowAlgo(width, len(df), False).signals)
+        return lambda: backtest.start(
+            100, FixedWindowAlgo(width, len(df), False).logic)
+    return setup
+
+
+def starter_case(module_name, df):
+    def setup():
+        module = __import__(module_name)
+        backtest = engine.backtest(df)
+        return lambda: backtest.start(100, module.logic)
+    return setup
+
+
+def account_case(method, positions):
+    """Micro benchmark of one Account method with positions open."""
+    def setup():
+        def prepare():
+            account = exchange.Account(positions * 10.0 + 10)
+            for i in range(positions):
+                account.enter_position("long" if i % 2 else "short", 10, 1.0 + i % 7)
+            return account
+
+        if method == "enter_position":
+            def run():
+                account = exchange.Account(positions * 10.0 + 10)
+                for i in range(positions):
+                    account.enter_position("long", 10, 1.0 + i % 7)
+        elif method == "close_position":
+            def run(account):
+                for p in account.positions:
+                    account.close_position(p, 1.0, 2.0)
+            return prepare, run
+        elif method == "total_value":
+            account = prepare()
+
+            def run():
+                for _ in range(100):
+                    account.total_value(2.0)
+        elif method == "purge_positions":
+            # A purge only does work after positions were closed, so every
+            # repetition gets fresh accounts with half of them closed
+            def half_closed():
+                accounts = [prepare() for _ in range(PURGE_ACCOUNTS)]
+                for account in accounts:
+                    for p in account.positions[::2]:
+                        account.close_position(p, 1.0, 2.0)
+                return accounts
+
+            def run(accounts):
+                for account in accounts:
+                    account.purge_positions()
+            return half_closed, run
+        return run
+    return setup
+
+
+def cold_start_case(argv):
+    """A fresh interpreter running a command, as a scheduler would launch it"""
+    def setup():
+        command = [sys.executable] + argv
+        return lambda: subprocess.run(command, cwd=ROOT, check=True,
+                                      stdout=subprocess.DEVNULL)
+    return setup
+
+
+def cases(quick):
+    dataset_bars = 1000 if quick else None
+    starter_bars = 500 if quick else 5000
+    synthetic_sizes = [10_000] if quick else [10_000, 100_000, 1_000_000]
+    position_counts = [1, 100] if quick else [1, 100, 1000]
+
+    for asset in ASSETS:
+        df = bundled(asset, dataset_bars)
+        yield ("fixed_window/" + asset, "dataset", len(df), fixed_window_case(df))
+        yield ("fixed_window_vectorized/" + asset, "dataset", len(df),
+               fixed_window_case(df, vectorized=True))
+
+    for module_name in ("starter_momentum_algorithm",
+                        "starter_momentum_algorithm_graphing", "main"):
+        # The starter logic rebuilds its rolling columns every bar, which is
+        # quadratic, so these only run on the start of the dataset
+        df = bundled("BTC", starter_bars)
+        yield ("starter/" + module_name, "starter", len(df),
+               starter_case(module_name, df))
+
+    for bars in synthetic_sizes:
+        df = synthetic(bars)
+        yield ("synthetic/fixed_window/{0}".format(bars), "synthetic", bars,
+               fixed_window_case(df))
+        yield ("synthetic/fixed_window_vectorized/{0}".format(bars), "synthetic",
+               bars, fixed_window_case(df, vectorized=True))
+
+    yield ("cold_start/import", "cold_start", 1, cold_start_case(
+        ["-c", "import momentum_algo, main, starter_momentum_algorithm, "
+               "starter_momentum_algorithm_graphing"]))
+    yield ("cold_start/cli_fixed_window", "cold_start", 1, cold_start_case(
+        ["-m", "gemini_modules", "fixed_window", "XRP", "--param",
+         "lookback_tick_width=145", "--vectorized", "--json"]))
+
+    for method in ("enter_position", "close_position", "total_value",
+                   "purge_positions"):
+        for positions in position_counts:
+            yield ("account/{0}/{1}".format(method, positions), "account",
+                   positions, account_case(method, positions))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(quick=False, pattern=None, repeat=None):
+    """Runs the selected cases and returns the report as a dict."""
+    results = []
+    for name, group, bars, setup in cases(quick):
+        if pattern is not None and pattern not in name:
+            continue
+        func = setup()
+        times = repeat or (3 if group in ("account", "cold_start") else 1)
+        best, median = measure(func, times)
+        results.append({
+            "name": name,
+            "group": group,
+            "size": bars,
+            "repeat": times,
+            "best": best,
+            "median": median,
+            "per_second": bars / best if best > 0 else None,
+        })
+        print("{0:<55} {1:>10.4f}s".format(name, best), flush=True)
+
+    return {
+        "commit": git_commit(),
+        "quick": quick,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true",
+                        help="reduced sizes for CI")
+    parser.add_argument("--filter", default=None,
+                        help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="runs per case, the best time is kept")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    os.chdir(ROOT)  # the starter scripts read data/ relative to the root
+    report = run(args.quick, args.filter, args.repeat)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Wrote {0}".format(output))
@@ -1,3 +1,82 @@
+import numpy as np
+
+
+def _rolling_extremum(values, ticks, extremum, pad):
+    """
+    Extremum of the last ticks values at every bar, by the van Herk/Gil-Werman
+    algorithm: the values are cut into blocks of ticks, every window spans
+    the end of one block and the start of the next, so it is the extremum
+    of a block suffix and a block prefix. O(n) whatever the number of ticks.
+    The first ticks - 1 bars use all the values so far, and a NaN in a
+    window gives a NaN.
+    """
+    if ticks < 1:
+        raise ValueError("Error: ticks must be at least one.")
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    blocks = -(-(n + ticks - 1) // ticks)
+    padded = np.full(blocks * ticks, pad)
+    padded[ticks - 1:ticks - 1 + n] = values
+    padded = padded.reshape(blocks, ticks)
+    prefix = extremum.accumulate(padded, axis=1).ravel()
+    suffix = extremum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return extremum(suffix[:n], prefix[ticks - 1:ticks - 1 + n])
+
+
+def support_series(asset_history, ticks):
+    """
+    Input:
+        asset_history       historical price movement of asset
+        ticks               integer number of ticks
+
+    Output:
+        support_levels      array of the support level at every tick, as
+                            return_support gives on the history up to it
+    """
+    return _rolling_extremum(asset_history["low"], ticks, np.minimum, np.inf)
+
+
+def resistance_series(asset_history, ticks):
+    """
+    Input:
+        asset_history       historical price movement of asset
+        ticks               integer number of ticks
+
+    Output:
+        resistance_levels   array of the resistance level at every tick, as
+                            return_resistance gives on the history up to it
+    """
+    return _rolling_extremum(asset_history["high"], ticks, np.maximum, -np.inf)
+
+
+def support_matrix(asset_history, widths):
+    """
+    Input:
+        asset_history       historical price movement of asset
+        widths              integer numbers of ticks
+
+    Output:
+        support_levels      2-D array, the support_series of each width by row
+    """
+    lows = np.asarray(asset_history["low"], dtype=float)
+    return np.array([_rolling_extremum(lows, ticks, np.minimum, np.inf)
+                     for ticks in widths]).reshape(len(widths), len(lows))
+
+
+def resistance_matrix(asset_history, widths):
+    """
+    Input:
+        asset_history       historical price movement of asset
+        widths              integer numbers of ticks
+
+    Output:
+        resistance_levels   2-D array, the resistance_series of each width by row
+    """
+    highs = np.asarray(asset_history["high"], dtype=float)
+    return np.array([_rolling_extremum(highs, ticks, np.maximum, -np.inf)
+                     for ticks in widths]).reshape(len(widths), len(highs))
+
+
 def return_support(asset_history, ticks):
     """
     Input:
@@ -8,9 +87,10 @@ def return_support(asset_history, ticks):
         support_level       price at which a SELL recommendation is issued
                             i.e. lowest price of asset over the defined number of ticks
     """
-    prices = asset_history["low"][-ticks:]
-    
-    support_level = min(prices)
+    prices = np.asarray(asset_history["low"])[-ticks:]
+
+    # Same type as the prices, as the series are computed in floats
+    support_level = prices.dtype.type(support_series({"low": prices}, ticks)[-1])
     return support_level
 
 def return_resistance(asset_history, ticks):
@@ -23,9 +103,10 @@ def return_resistance(asset_history, ticks):
         resistance_level    price at which a BUY recommendation is issued
                             highest price of asset over the defined number of ticks
     """
-    prices = asset_history["high"][-ticks:]
-    
-    resistance_level = max(prices)
+    prices = np.asarray(asset_history["high"])[-ticks:]
+
+    # Same type as the prices, as the series are computed in floats
+    resistance_level = prices.dtype.type(resistance_series({"high": prices}, ticks)[-1])
     return resistance_level
 
 def algorithm_setup():
@@ -35,7 +116,7 @@ def algorithm_setup():
     return -1
     
 def calc_order(order_type, share, portfolio):
-     """
+    """
     Used to calculate number of shares bought
     """
     return -1
@@ -0,0 +1,5 @@
+import sys
+
+from gemini_modules.cli import main
+
+sys.exit(main())
@@ -0,0 +1,165 @@
+"""Run a batch of backtests listed in a config file.
+
+Usage:
+    python -m gemini_modules batch CONFIG [--output FILE]
+
+The config is json, either a list of jobs or an object with "jobs" and
+"defaults" applied to every job:
+
+    {"defaults": {"initial_capital": 100, "vectorized": true},
+     "jobs": [{"strategy": "fixed_window", "dataset": "XRP",
+               "params": {"lookback_tick_width": 145}}]}
+
+Jobs are grouped by dataset: each dataset is loaded once, every job on it
+runs against the same columns, and it is released before the next one is
+loaded, so memory holds one dataset at a time. All results go into one
+csv or json file (by extension), one row per job in config order.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+
+# Local imorts
+from gemini_modules import cli
+
+JOB_FIELDS = ("strategy", "dataset", "params", "initial_capital", "vectorized")
+DEFAULTS = {"params": {}, "initial_capital": 100, "vectorized": False}
+
+
+def load_config(path):
+    """
+    Read the jobs of a config file, with the defaults filled in
+    :param path:
+    :return: list of job dicts
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {"jobs": config}
+    defaults = dict(DEFAULTS, **config.get("defaults", {}))
+
+    jobs = []
+    for i, job in enumerate(config["jobs"]):
+        job = dict(defaults, **job)
+        unknown = set(job) - set(JOB_FIELDS)
+        missing = {"strategy", "dataset"} - set(job)
+        if unknown or missing:
+            raise ValueError("Error: Job {0} has unknown fields {1} or is missing {2}".format(
+                i, sorted(unknown), sorted(missing)))
+        if job["strategy"] not in cli.STRATEGIES:
+            raise ValueError("Error: Job {0} has unknown strategy {1}".format(i, job["strategy"]))
+        job["path"] = cli.dataset_path(job["dataset"])
+        jobs.append(job)
+    return jobs
+
+
+def run_job(backtest, job):
+    """
+    Run one job on the backtest of its dataset
+    :param backtest: engine.backtest over the job's dataset
+    :param job:
+    :return: result row
+    """
+    from gemini_modules import metrics
+
+    # Logic functions take their parameters as module globals, put them back after
+    module = cli.strategy_module(job["strategy"])
+    saved = {p: getattr(module, p) for p in job["params"] if hasattr(module, p)}
+    try:
+        strategy = cli.load_strategy(job["strategy"], job["params"], len(backtest.data),
+                                     job["vectorized"])
+        if job["vectorized"]:
+            result = backtest.start_vectorized(job["initial_capital"], strategy)
+        else:
+            result = backtest.start(job["initial_capital"], strategy)
+    finally:
+        for param, value in saved.items():
+            setattr(module, param, value)
+
+    row = {"final_equity": result["strategy_equity"].iloc[-1]}
+    row.update(metrics.compute(result, backtest.account).to_dict())
+    return row
+
+
+def run_jobs(jobs, log=None):
+    """
+    Run jobs a dataset at a time
+
+    :param jobs: as returned by load_config
+    :param log: file to report progress to
+    :return: dataframe, one row per job in the order given
+    """
+    import pandas as pd
+    from gemini_modules import dataset, engine
+
+    groups = {}
+    for i, job in enumerate(jobs):
+        groups.setdefault(job["path"], []).append(i)
+
+    rows = [None] * len(jobs)
+    for path, indexes in groups.items():
+        started = time.perf_counter()
+        backtest = engine.backtest(dataset.load(path))
+        if log is not None:
+            print("{0}: loaded in {1:.3f}s, {2} job(s)".format(
+                path, time.perf_counter() - started, len(indexes)), file=log)
+
+        for i in indexes:
+            job = jobs[i]
+            row = {"job": i, "strategy": job["strategy"], "dataset": job["dataset"],
+                   "initial_capital": job["initial_capital"],
+                   "vectorized": job["vectorized"],
+                   "params": json.dumps(job["params"], sort_keys=True)}
+            started = time.perf_counter()
+            try:
+                row.update(run_job(backtest, job))
+                row["error"] = None
+            except Exception as e:
+                row["error"] = "".join(traceback.format_exception_only(type(e), e)).strip()
+            row["seconds"] = time.perf_counter() - started
+            rows[i] = row
+            if log is not None:
+                print("  job {0} {1} {2}: {3}".format(
+                    i, job["strategy"], row["params"],
+                    row["error"] or "{0:.2f}".format(row["final_equity"])), file=log)
+
+        # Only one dataset is held at a time
+        del backtest
+    return pd.DataFrame(rows)
+
+
+def write_results(results, output):
+    """
+    Write the results as csv, or json/jsonl by the file extension
+    :param results:
+    :param output:
+    :return:
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension == ".json":
+        results.to_json(output, orient="records", indent=2)
+    elif extension == ".jsonl":
+        results.to_json(output, orient="records", lines=True)
+    else:
+        results.to_csv(output, index=False)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gemini_modules batch",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("config", help="json file listing the jobs")
+    parser.add_argument("--output", default="batch_results.csv",
+                        help="results file, .csv, .json or .jsonl")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    args = parser.parse_args(argv)
+
+    jobs = load_config(args.config)
+    results = run_jobs(jobs, log=None if args.quiet else sys.stderr)
+    write_results(results, args.output)
+    failed = results["error"].notna().sum()
+    print("Wrote {0} result(s) to {1}, {2} failed".format(len(results), args.output, failed))
+    return 1 if failed else 0
@@ -0,0 +1,167 @@
+"""Run a strategy on a dataset.
+
+Usage:
+    python -m gemini_modules STRATEGY DATASET [--param NAME=VALUE ...]
+        [--capital C] [--start DATE] [--end DATE] [--vectorized] [--json] [--timing]
+    python -m gemini_modules batch CONFIG [--output FILE], see gemini_modules.batch
+
+e.g. python -m gemini_modules fixed_window XRP --param lookback_tick_width=145
+
+Only the standard library is imported up front, the engine, the strategy
+and the dataset are loaded once the arguments are parsed, and plotting
+libraries only if the strategy plots.
+"""
+import argparse
+import ast
+import importlib
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Strategies by name, as module:attribute. A class is built with the
+# parameters, a logic function gets them set as module globals
+STRATEGIES = {
+    "fixed_window": "momentum_algo:FixedWindowAlgo",
+    "breakout": "main:logic",
+    "starter": "starter_momentum_algorithm:logic",
+    "starter_graphing": "starter_momentum_algorithm_graphing:logic",
+}
+
+
+def dataset_path(name):
+    """
+    XRP -> data/USDT_XRP.csv, anything that is a file is used as is
+    :param name:
+    :return:
+    """
+    if os.path.isfile(name):
+        return name
+    path = os.path.join(ROOT, "data", "USDT_{0}.csv".format(name.upper()))
+    if not os.path.isfile(path):
+        raise ValueError("Error: No dataset {0}".format(name))
+    return path
+
+
+def parse_param(text):
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError("Parameters are NAME=VALUE, got {0}".format(text))
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def strategy_module(name):
+    """
+    Import the module of a strategy
+    :param name: key of STRATEGIES
+    :return:
+    """
+    if ROOT not in sys.path:
+        sys.path.append(ROOT)
+    return importlib.import_module(STRATEGIES[name].split(":")[0])
+
+
+def load_strategy(name, params, bars, vectorized=False):
+    """
+    Import a strategy and return the function to pass to the engine
+    :param name: key of STRATEGIES
+    :param params: constructor arguments or module globals
+    :param bars: length of the dataset
+    :param vectorized: return the signals function of a strategy class
+    :return:
+    """
+    module = strategy_module(name)
+    strategy = getattr(module, STRATEGIES[name].split(":")[1])
+    if isinstance(strategy, type):
+        algo = strategy(total_df_length=bars, should_plot=False, **params)
+        return algo.signals if vectorized else algo.logic
+    if vectorized:
+        raise ValueError("Error: {0} has no vectorized signals".format(name))
+    for param, value in params.items():
+        if not hasattr(module, param):
+            raise ValueError("Error: {0} has no parameter {1}".format(name, param))
+        setattr(module, param, value)
+    return strategy
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["batch"]:
+        from gemini_modules import batch
+        return batch.main(argv[1:])
+    parser = argparse.ArgumentParser(prog="python -m gemini_modules",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("dataset", help="asset, e.g. XRP, or path of a csv")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help="strategy parameter as NAME=VALUE, repeatable")
+    parser.add_argument("--capital", type=float, default=100)
+    parser.add_argument("--start", default=None, help="first date to include")
+    parser.add_argument("--end", default=None, help="last date to include")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="run the strategy's signals with start_vectorized")
+    parser.add_argument("--json", action="store_true",
+                        help="print the metrics as one json line instead of the results")
+    parser.add_argument("--timing", action="store_true",
+                        help="report the time spent in each step of the run on stderr")
+    parser.add_argument("--checkpoint", default=None, metavar="FILE",
+                        help="resume the run saved in FILE if it exists, "
+                             "then save the run to it")
+    args = parser.parse_args(argv)
+    if args.checkpoint and args.vectorized:
+        parser.error("--checkpoint cannot be used with --vectorized")
+
+    timing = {"parse": time.perf_counter() - started}
+    last = time.perf_counter()
+
+    def lap(step):
+        nonlocal last
+        now = time.perf_counter()
+        timing[step] = now - last
+        last = now
+
+    from gemini_modules import dataset, engine, metrics
+    lap("import")
+
+    df = dataset.load(dataset_path(args.dataset), start=args.start, end=args.end)
+    lap("load")
+
+    strategy = load_strategy(args.strategy, dict(args.param), len(df), args.vectorized)
+    lap("strategy")
+
+    backtest = engine.backtest(df)
+    # Settings a checkpoint must have been saved with to be resumed
+    labels = {"strategy": args.strategy, "params": dict(args.param), "capital": args.capital}
+    if args.vectorized:
+        result = backtest.start_vectorized(args.capital, strategy)
+    elif args.checkpoint and os.path.exists(args.checkpoint):
+        try:
+            result = backtest.resume(args.checkpoint, labels=labels)
+        except ValueError as error:
+            parser.error("cannot resume {0}: {1}".format(args.checkpoint, error))
+    else:
+        result = backtest.start(args.capital, strategy)
+    if args.checkpoint:
+        backtest.checkpoint(args.checkpoint, labels)
+    lap("backtest")
+
+    if args.json:
+        row = {"strategy": args.strategy, "dataset": args.dataset, "bars": len(df)}
+        row.update(dict(args.param))
+        row.update(metrics.compute(result, backtest.account).to_dict())
+        print(json.dumps(row, default=float))
+    else:
+        backtest.results()
+    lap("report")
+
+    if args.timing:
+        timing["total"] = time.perf_counter() - started
+        for step, seconds in timing.items():
+            print("{0:<9}: {1:.4f}s".format(step, seconds), file=sys.stderr)
+    return 0
@@ -0,0 +1,224 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows, builds are not locked
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".cache"
+FORMAT_VERSION = 1
+
+
+def cache_path(path):
+    """
+    Directory holding the binary columns of a csv,
+    data/USDT_BTC.csv -> data/.cache/USDT_BTC
+    :param path:
+    :return:
+    """
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, CACHE_DIR, os.path.splitext(name)[0])
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_meta(folder):
+    try:
+        with open(os.path.join(folder, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(folder, meta):
+    # Written aside and swapped in, so readers never see half of it
+    tmp = os.path.join(folder, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(folder, 'meta.json'))
+
+
+@contextlib.contextmanager
+def _locked(folder, shared=False):
+    """
+    Hold <folder>.lock, exclusively to check and build a cache, shared to
+    read one, so a build never swaps a cache out from under a reader
+    """
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+    with open(folder + '.lock', 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build(path):
+    """
+    Convert a csv into one .npy file per column. Dates are stored as int64
+    epoch nanoseconds, every other column as contiguous float64. Does not
+    lock, see :func:`ensure` for building from several processes.
+    :param path:
+    :return: cache directory
+    """
+    # Taken before reading, so bars appended meanwhile make the cache
+    # stale rather than recorded as included
+    stat = os.stat(path)
+    digest = _file_hash(path)
+    df = pd.read_csv(path, parse_dates=[0])
+    date_column = df.columns[0]
+    meta = {'version': FORMAT_VERSION,
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': digest,
+            'rows': len(df),
+            'columns': list(df.columns),
+            'date_column': date_column}
+
+    folder = cache_path(path)
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(folder))
+    try:
+        for column in df.columns:
+            if column == date_column:
+                values = df[column].to_numpy().astype('datetime64[ns]').view('int64')
+            else:
+                values = df[column].to_numpy(dtype='float64')
+            np.save(os.path.join(tmp, column + '.npy'),
+                    np.ascontiguousarray(values))
+        _write_meta(tmp, meta)
+
+        # Swap the finished cache in so readers never see half of one
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.replace(tmp, folder)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return folder
+
+
+def ensure(path):
+    """
+    Return the cache directory of a csv, rebuilding it if the csv changed.
+    Safe to call from several processes at once, the first one to find the
+    cache stale builds it while the others wait for it.
+    :param path:
+    :return:
+    """
+    folder = cache_path(path)
+    meta = _read_meta(folder)
+    stat = os.stat(path)
+    if (meta is not None and meta.get('version') == FORMAT_VERSION
+            and meta['mtime'] == stat.st_mtime_ns and meta['size'] == stat.st_size):
+        return folder
+
+    with _locked(folder):
+        # Another process may have built it while this one waited
+        meta = _read_meta(folder)
+        if meta is None or meta.get('version') != FORMAT_VERSION:
+            return build(path)
+
+        stat = os.stat(path)
+        if meta['mtime'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return folder
+
+        # Touched, but maybe not changed
+        if meta['size'] == stat.st_size and meta['hash'] == _file_hash(path):
+            meta['mtime'] = stat.st_mtime_ns
+            _write_meta(folder, meta)
+            return folder
+        return build(path)
+
+
+def load_columns(path, columns=None, start=None, end=None):
+    """
+    Memory map the cached columns of a csv
+
+    :param path: csv file
+    :param columns: columns to load, defaults to all of them
+    :param start: first date to include
+    :param end: last date to include
+    :return: dict of read-only arrays by column, dates as datetime64[ns]
+    """
+    while True:
+        folder = ensure(path)
+        with _locked(folder, shared=True):
+            # The meta and the columns mapped come from the same build, and
+            # stay readable once a later build removes them
+            meta = _read_meta(folder)
+            if meta is not None:
+                return _map_columns(folder, meta, path, columns, start, end)
+
+
+def _map_columns(folder, meta, path, columns, start, end):
+    date_column = meta['date_column']
+    columns = meta['columns'] if columns is None else list(columns)
+    missing = set(columns) - set(meta['columns'])
+    if len(missing) > 0:
+        raise KeyError("Missing {0} column(s) in {1}".format(list(missing), path))
+
+    dates = np.load(os.path.join(folder, date_column + '.npy'), mmap_mode='r')
+    first, last = 0, len(dates)
+    if start is not None:
+        first = np.searchsorted(dates, pd.Timestamp(start).value, 'left')
+    if end is not None:
+        last = np.searchsorted(dates, pd.Timestamp(end).value, 'right')
+
+    result = {}
+    for column in columns:
+        if column == date_column:
+            values = dates[first:last].view('datetime64[ns]')
+        else:
+            values = np.load(os.path.join(folder, column + '.npy'),
+                             mmap_mode='r')[first:last]
+        result[column] = values
+    return result
+
+
+def load(path, columns=None, start=None, end=None):
+    """
+    Drop-in for ``pd.read_csv(path, parse_dates=[0])`` served from the cache
+
+    :param path: csv file
+    :param columns: columns to load, defaults to all of them
+    :param start: first date to include
+    :param end: last date to include
+    :return: pandas.DataFrame
+    """
+    return pd.DataFrame(load_columns(path, columns, start, end))
+
+
+def iter_chunks(path, chunksize=100000, columns=None, start=None, end=None):
+    """
+    Stream the cached columns of a csv as dataframes of at most chunksize
+    rows, so only one chunk at a time is read into memory
+
+    :param path: csv file
+    :param chunksize: rows per dataframe
+    :param columns: columns to load, defaults to all of them
+    :param start: first date to include
+    :param end: last date to include
+    :return: generator of pandas.DataFrame
+    """
+    mapped = load_columns(path, columns, start, end)
+    rows = len(next(iter(mapped.values()))) if mapped else 0
+    for first in range(0, rows, chunksize):
+        yield pd.DataFrame({column: np.array(values[first:first + chunksize])
+                            for column, values in mapped.items()})
@@ -1,11 +1,24 @@
-import bokeh.plotting
 import pandas as pd
 import numpy as np
+import os
+import pickle
 import warnings
 import time
 
 # Local imorts
-from gemini_modules import exchange, helpers
+from gemini_modules import exchange, helpers, metrics
+from gemini_modules.lookback import Lookback, RingLookback
+
+# Columns of the frame returned by a backtest
+RESULT_COLUMNS = ['benchmark_equity', 'strategy_equity', 'benchmark_return',
+                  'strategy_return']
+
+# Bumped when the contents of backtest.checkpoint change
+CHECKPOINT_VERSION = 2
+
+# Phases of the bar loop timed by backtest.start(..., profile=True)
+PHASES = ['row_fetch', 'total_value', 'stop_loss', 'purge_positions',
+          'tracker', 'lookback', 'logic']
 
 class backtest():
     """An object representing a backtesting simulation."""
@@ -26,66 +39,332 @@ class backtest():
             warnings.warn(msg)
 
         self.data = data
+        # Logic and lookback of the last bar by bar run, see checkpoint
+        self.logic = None
+        self.lookback = None
+        # Phase breakdown of the last run, see profile_results
+        self.profile = None
 
-    def start(self, initial_capital, logic):
+    def start(self, initial_capital, logic, profile=False, fee=None):
         """Start backtest.
 
         :param initial_capital: Starting capital to fund account
         :type initial_capital: float
-        :param logic: A function that will be applied to each lookback period of the data
+        :param logic: A function that will be applied to each lookback period of the data,
+            the lookback is a :class:`Lookback` view over the rows seen so far
         :type logic: function
+        :param profile: Time each phase of the bar loop, see :meth:`profile_results`
+        :type profile: bool
+        :param fee: Fee rate by position type, defaults to ``settings.FEES``
+        :type fee: dict
 
         :return: A bactesting simulation
         :rtype: backtest
         """
-        self.tracker = []
-        self.account = exchange.Account(initial_capital)
-        
+        self.account = exchange.Account(initial_capital, fee)
+
+        # Equity tracking, filled in place and wrapped by the result frame
+        tracker = self._tracker(self.data['close'].to_numpy())
+        return self._run(logic, Lookback(self.data), tracker, 0, profile)
+
+    def _run(self, logic, lookback, tracker, first, profile=False):
+        """Run the bars from first on, then keep what a checkpoint needs"""
+        self.profile = None
+
+        # Seconds spent in each phase, only touched when profiling
+        clock = time.perf_counter
+        spent = dict.fromkeys(PHASES, 0.0)
+
+        dates = self.data['date'].iloc[first:].tolist()
+        lows = self.data['low'].to_numpy()
+        highs = self.data['high'].to_numpy()
+        closes = self.data['close'].to_numpy()
+
+        strategy_equity = tracker[1]
+        started = last = clock()
+
         # Enter backtest ---------------------------------------------  
-        for index, today in self.data.iterrows():
+        for index in range(first, len(self.data)):
     
-            date = today['date']
-            equity = self.account.total_value(today['close'])
-
-            # Handle stop loss
-            for p in self.account.positions:
-                if p.type_ == "long":
-                    if p.stop_loss >= (today['low']):
-                        self.account.close_position(p, 1.0, today['low'])
-                if p.type_ == "short":
-                    if p.stop_loss <= today['high']:
-                        self.account.close_position(p, 1.0, today['high'])
+            date = dates[index - first]
+            low, high, close = lows[index], highs[index], closes[index]
+            if profile: now = clock(); spent['row_fetch'] += now - last; last = now
 
-            self.account.purge_positions()
+            equity = self.account.total_value(close)
+            if profile: now = clock(); spent['total_value'] += now - last; last = now
 
-            # Update account variables
+            # Update account variables, stops are hit on this bar
             self.account.date = date
-            self.account.equity.append(equity)
+
+            # Handle stop loss and take profit
+            for p, price in self.account.triggered_positions(low, high):
+                self.account.close_position(p, 1.0, price)
+            if profile: now = clock(); spent['stop_loss'] += now - last; last = now
+
+            self.account.purge_positions()
+            if profile: now = clock(); spent['purge_positions'] += now - last; last = now
 
             # Equity tracking
-            self.tracker.append({'date': date, 
-                                 'benchmark_equity' : today['close'],
-                                 'strategy_equity' : equity})
+            strategy_equity[index] = equity
+            self.account.equity = strategy_equity[:index+1]
+            if profile: now = clock(); spent['tracker'] += now - last; last = now
 
             # Execute trading logic
-            lookback = self.data[0:index+1]
+            lookback.advance()
+            if profile: now = clock(); spent['lookback'] += now - last; last = now
+
             logic(self.account, lookback)
+            if profile: now = clock(); spent['logic'] += now - last; last = now
 
             # Cleanup empty positions
             self.account.purge_positions()
+            if profile: now = clock(); spent['purge_positions'] += now - last; last = now
             
         # ------------------------------------------------------------
 
-        # For pyfolio
-        df = pd.DataFrame(self.tracker)
-        df['benchmark_return'] = (df.benchmark_equity-df.benchmark_equity.shift(1))/df.benchmark_equity.shift(1)
-        df['strategy_return'] = (df.strategy_equity-df.strategy_equity.shift(1))/df.strategy_equity.shift(1)
-        df.index = df['date']
-        del df['date']
+        if profile:
+            self.profile = self._profile_frame(spent, len(self.data) - first, clock() - started)
+        self.logic = logic
+        self.lookback = lookback
+        self.result = self._result_frame(self.data['date'].to_numpy(), tracker)
+        return self.result
+
+    def checkpoint(self, path, labels=None):
+        """Save the state of the last run of :meth:`start` or :meth:`resume`,
+        so it can be resumed once bars are appended to the data.
+
+        The account, the strategy the logic is bound to (with its indicators
+        and buy and sell points), the timeframes aggregated on the lookback
+        and the equity so far are pickled. The logic of a module level
+        function is saved by name, and its module globals are not saved.
+
+        :param path: File to write, replaced atomically
+        :type path: str
+        :param labels: What the run was started with, e.g. the strategy, its
+            parameters and the capital, checked by :meth:`resume`
+        :type labels: dict
+        """
+        if self.logic is None:
+            raise ValueError("Backtest must be started with start or resume before it is checkpointed")
+        bars = len(self.lookback)
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'bars': bars,
+            'first_date': self.data['date'].iloc[0],
+            'last_date': self.data['date'].iloc[bars-1],
+            'last_close': float(self.data['close'].iloc[bars-1]),
+            'account': self.account,
+            'logic': self.logic,
+            'timeframes': self.lookback._timeframes,
+            'equity': self.result['strategy_equity'].to_numpy()[:bars].copy(),
+            'labels': labels,
+        }
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def resume(self, path, logic=None, profile=False, labels=None):
+        """Continue a checkpointed run over the bars appended since.
+
+        Only the new bars are run through the stops and the logic, so the
+        time taken grows with the new data rather than the whole history.
+        Checkpoints are pickles, only resume ones you wrote.
+
+        :param path: File written by :meth:`checkpoint`
+        :type path: str
+        :param logic: Replaces the saved logic, e.g. a module level function
+        :type logic: function
+        :param profile: Time each phase of the bar loop, see :meth:`profile_results`
+        :type profile: bool
+        :param labels: Must equal the labels the checkpoint was saved with,
+            so a run is not resumed with other settings
+        :type labels: dict
+
+        :return: Benchmark and strategy equity and returns of every bar
+        :rtype: pandas.DataFrame
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError("Checkpoint was written by another version")
+        if labels is not None and state['labels'] != labels:
+            raise ValueError("Checkpoint was saved for {0}, not {1}".format(state['labels'], labels))
+
+        bars = state['bars']
+        dates = self.data['date']
+        if (len(self.data) < bars or dates.iloc[0] != state['first_date']
+                or dates.iloc[bars-1] != state['last_date']
+                or self.data['close'].iloc[bars-1] != state['last_close']):
+            raise ValueError("Data does not extend the data of the checkpoint")
+
+        self.account = state['account']
+        lookback = Lookback(self.data, end=bars)
+        lookback.attach_timeframes(state['timeframes'])
+        tracker = self._tracker(self.data['close'].to_numpy())
+        tracker[1, :bars] = state['equity']
+        self.account.equity = tracker[1, :bars]
+        logic = state['logic'] if logic is None else logic
+        return self._run(logic, lookback, tracker, bars, profile)
+
+    @staticmethod
+    def _profile_frame(spent, bars, total):
+        """Per phase breakdown of a profiled run"""
+        calls = {phase: bars for phase in PHASES}
+        calls['purge_positions'] = 2*bars
+        df = pd.DataFrame({'seconds': pd.Series(spent), 'calls': pd.Series(calls)})
+        df.loc['other'] = [max(total - sum(spent.values()), 0.0), 0]
+        df['calls'] = df['calls'].astype(int)
+        df['per_call'] = df['seconds']/df['calls'].where(df['calls'] > 0)
+        df['share'] = df['seconds']/total
+        df.attrs['bars'] = bars
+        df.attrs['seconds'] = total
+        df.attrs['bars_per_second'] = bars/total if total > 0 else float('inf')
+        df.index.name = 'phase'
         return df
 
+    def profile_results(self):
+        """Print and return the phase breakdown of the last profiled run.
+
+        :return: Seconds, calls, seconds per call and share of the run by phase
+        :rtype: pandas.DataFrame
+        """
+        if self.profile is None:
+            raise ValueError("Backtest was not started with profile=True")
+        print("-------------- Profile ----------------\n")
+        print("Bars         : {0}".format(self.profile.attrs['bars']))
+        print("Seconds      : {0}".format(round(self.profile.attrs['seconds'], 4)))
+        print("Bars/second  : {0}".format(round(self.profile.attrs['bars_per_second'], 1)))
+        print()
+        print(self.profile.to_string(float_format=lambda x: "{0:.6g}".format(x)))
+        print("\n---------------------------------------")
+        return self.profile
+
+    def start_vectorized(self, initial_capital, signals, fee=None):
+        """Start backtest from precomputed signal arrays.
+
+        Only the bars where a long position is entered or closed are
+        visited, the equity curve is filled in with array operations.
+        Within a bar the stop loss is handled first, then the entry and
+        finally the exit, as with a ``logic`` function under :meth:`start`.
+
+        :param initial_capital: Starting capital to fund account
+        :type initial_capital: float
+        :param signals: A function taking the whole dataframe and returning a
+            mapping with boolean ``entry`` and ``exit`` arrays and an optional
+            ``stop`` array holding the stop loss of a position entered on that bar
+        :type signals: function
+        :param fee: Fee rate by position type, defaults to ``settings.FEES``
+        :type fee: dict
+
+        :return: Benchmark and strategy equity and returns indexed by date
+        :rtype: pandas.DataFrame
+        """
+        self.account = exchange.Account(initial_capital, fee)
+        # Nothing to checkpoint, the run is not bar by bar
+        self.logic = None
+        self.lookback = None
+        self.profile = None
+
+        n = len(self.data)
+        sig = signals(self.data)
+        entries = np.flatnonzero(np.asarray(sig['entry'], dtype=bool))
+        exits = np.flatnonzero(np.asarray(sig['exit'], dtype=bool))
+        stops = np.zeros(n) if sig.get('stop') is None else np.nan_to_num(
+            np.asarray(sig['stop'], dtype=float))
+        dates = self.data['date']
+        lows = self.data['low'].to_numpy()
+        closes = self.data['close'].to_numpy()
+
+        # Account state after each event bar, forward filled afterwards
+        cash = np.full(n, np.nan)
+        shares = np.full(n, np.nan)
+
+        # Walk trade by trade -----------------------------------------
+        t = 0
+        while self.account.buying_power > 0:
+            i = np.searchsorted(entries, t)
+            if i == len(entries):
+                break
+            entry = entries[i]
+            self.account.date = dates.iloc[entry]
+            self.account.enter_position('long', self.account.buying_power,
+                                        closes[entry], stop_loss=stops[entry])
+            position = self.account.positions[-1]
+
+            # The stop is checked from the next bar, the exit from this one
+            exit_ = n
+            j = np.searchsorted(exits, entry)
+            if j < len(exits):
+                exit_ = exits[j]
+            stopped = n
+            if position.stop_loss > 0:
+                hit = np.flatnonzero(lows[entry+1:exit_+1] <= position.stop_loss)
+                if len(hit) > 0:
+                    stopped = entry + 1 + hit[0]
+
+            cash[entry] = self.account.buying_power
+            shares[entry] = position.shares
+
+            if stopped < n and stopped <= exit_:
+                # Stopped out before the logic runs, so it may enter again
+                closed, price, t = stopped, lows[stopped], stopped
+            elif exit_ < n:
+                closed, price, t = exit_, closes[exit_], exit_ + 1
+            else:
+                break
+            self.account.date = dates.iloc[closed]
+            self.account.close_position(position, 1.0, price)
+            self.account.purge_positions()
+            cash[closed] = self.account.buying_power
+            shares[closed] = 0.0
+        # ------------------------------------------------------------
+
+        # Equity on a bar is valued before that bar's stops and logic
+        filled = np.where(np.isnan(cash), 0, np.arange(n))
+        np.maximum.accumulate(filled, out=filled)
+        cash = np.concatenate(([initial_capital], np.where(
+            np.isnan(cash[filled]), initial_capital, cash[filled])[:-1]))
+        shares = np.concatenate(([0.0], np.nan_to_num(shares[filled])[:-1]))
+        tracker = self._tracker(closes)
+        np.multiply(shares, closes, out=tracker[1])
+        tracker[1] += cash
+
+        self.account.equity = tracker[1]
+        self.result = self._result_frame(dates.to_numpy(), tracker)
+        return self.result
+
+    @staticmethod
+    def _tracker(benchmark_equity):
+        """Preallocate the benchmark_equity, strategy_equity, benchmark_return
+        and strategy_return rows of a run, one column per bar"""
+        tracker = np.empty((len(RESULT_COLUMNS), len(benchmark_equity)))
+        tracker[0] = benchmark_equity
+        tracker[1:] = np.nan
+        return tracker
+
+    @staticmethod
+    def _result_frame(dates, tracker):
+        """Fill in the returns and wrap the tracker, without copying it, in a
+        frame indexed by date"""
+        # For pyfolio
+        for equity, returns in ((tracker[0], tracker[2]), (tracker[1], tracker[3])):
+            returns[0] = np.nan
+            np.subtract(equity[1:], equity[:-1], out=returns[1:])
+            returns[1:] /= equity[:-1]
+        index = pd.Index(dates, name='date')
+        return pd.DataFrame(tracker.T, index=index, columns=RESULT_COLUMNS, copy=False)
+
     def results(self):   
-        """Print results"""           
+        """Print results
+
+        :return: Metrics of the last run, see :func:`metrics.compute`
+        :rtype: metrics.Metrics
+        """           
         print("-------------- Results ----------------\n")
         being_price = self.data.iloc[0]['open']
         final_price = self.data.iloc[-1]['close']
@@ -98,10 +377,10 @@ class backtest():
         print("Strategy     : {0}%".format(round(pc*100, 2)))
         print("Net Profit   : {0}".format(round(helpers.profit(self.account.initial_capital, pc), 2)))
 
-        longs  = len([t for t in self.account.opened_trades if t.type_ == 'long'])
-        sells  = len([t for t in self.account.closed_trades if t.type_ == 'long'])
-        shorts = len([t for t in self.account.opened_trades if t.type_ == 'short'])
-        covers = len([t for t in self.account.closed_trades if t.type_ == 'short'])
+        longs  = self.account.opened_trades.count('long')
+        sells  = self.account.closed_trades.count('long')
+        shorts = self.account.opened_trades.count('short')
+        covers = self.account.closed_trades.count('short')
 
         print("Longs        : {0}".format(longs))
         print("Sells        : {0}".format(sells))
@@ -109,44 +388,403 @@ class backtest():
         print("Covers       : {0}".format(covers))
         print("--------------------")
         print("Total Trades : {0}".format(longs + sells + shorts + covers))
+        print("--------------------")
+
+        performance = metrics.compute(self.result, self.account)
+        print("Sharpe       : {0}".format(round(performance.sharpe, 2)))
+        print("Sortino      : {0}".format(round(performance.sortino, 2)))
+        print("Max Drawdown : {0}%".format(round(performance.max_drawdown*100, 2)))
+        print("DD Duration  : {0} bars".format(performance.max_drawdown_duration))
+        print("Exposure     : {0}%".format(round(performance.exposure*100, 2)))
+        print("Win Rate     : {0}%".format(round(performance.win_rate*100, 2)))
         print("\n---------------------------------------")
+        return performance
     
-    def chart(self, show_trades=False, title="Equity Curve"):
+    def chart(self, show_trades=False, title="Equity Curve", downsample='lttb',
+              points=2000, filename="chart.html", show=True):
         """Chart results.
 
         :param show_trades: Show trades on plot
         :type show_trades: bool
         :param title: Plot title
         :type title: str
-        """     
-        bokeh.plotting.output_file("chart.html", title=title)
-        p = bokeh.plotting.figure(x_axis_type="datetime", plot_width=1000, plot_height=400, title=title)
+        :param downsample: 'lttb' keeps the shape of the lines, 'minmax' every
+            spike, None draws every bar
+        :type downsample: str
+        :param points: Points drawn of each line when downsampling, so the
+            size of the chart does not grow with the number of bars
+        :type points: int
+        :param filename: Html file the chart is written to
+        :type filename: str
+        :param show: Open the chart, otherwise it is only saved
+        :type show: bool
+        """
+        import bokeh.plotting  # slow to import, so only when charting
+
+        dates = self.data['date'].to_numpy()
+        opens = self.data['open'].to_numpy()
+        equity = np.asarray(self.account.equity, dtype=float)
+        base_equity = opens*(self.account.initial_capital/opens[0])
+
+        bokeh.plotting.output_file(filename, title=title)
+        p = bokeh.plotting.figure(x_axis_type="datetime", width=1000, height=400, title=title)
         p.grid.grid_line_alpha = 0.3
         p.xaxis.axis_label = 'Date'
         p.yaxis.axis_label = 'Equity'
-        shares = self.account.initial_capital/self.data.iloc[0]['open']
-        base_equity = [price*shares for price in self.data['open']]      
-        p.line(self.data['date'], base_equity, color='#CAD8DE', legend='Buy and Hold')
-        p.line(self.data['date'], self.account.equity, color='#49516F', legend='Strategy')
+        for line, color, label in ((base_equity, '#CAD8DE', 'Buy and Hold'),
+                                   (equity, '#49516F', 'Strategy')):
+            rows = self._downsample(line, downsample, points)
+            p.line(dates[rows], line[rows], color=color, legend_label=label)
         p.legend.location = "top_left"
 
         if show_trades:
-            for trade in self.account.opened_trades:
-                try:
-                    x = time.mktime(trade.date.timetuple())*1000
-                    y = self.account.equity[np.where(self.data['date'] == trade.date.strftime("%Y-%m-%d"))[0][0]]
-                    if trade.type_ == 'long': p.circle(x, y, size=6, color='green', alpha=0.5)
-                    elif trade.type_ == 'short': p.circle(x, y, size=6, color='red', alpha=0.5)
-                except:
-                    pass
-
-            for trade in self.account.closed_trades:
-                try:
-                    x = time.mktime(trade.date.timetuple())*1000
-                    y = self.account.equity[np.where(self.data['date'] == trade.date.strftime("%Y-%m-%d"))[0][0]]
-                    if trade.type_ == 'long': p.circle(x, y, size=6, color='blue', alpha=0.5)
-                    elif trade.type_ == 'short': p.circle(x, y, size=6, color='orange', alpha=0.5)
-                except:
-                    pass
-        
-        bokeh.plotting.show(p)
+            # Row of each trade from a date index, one glyph per kind of trade
+            date_index = pd.Index(dates)
+            markers = ((self.account.opened_trades, {'long': 'green', 'short': 'red'}),
+                       (self.account.closed_trades, {'long': 'blue', 'short': 'orange'}))
+            for trades, colors in markers:
+                if len(trades) == 0:
+                    continue
+                frame = trades.to_frame()
+                rows = date_index.get_indexer(pd.DatetimeIndex(frame['date']))
+                for type_, color in colors.items():
+                    selected = rows[(frame['type'] == type_).to_numpy() & (rows >= 0)]
+                    selected = selected[selected < len(equity)]
+                    if len(selected) > 0:
+                        p.scatter(dates[selected], equity[selected], size=6,
+                                  color=color, alpha=0.5)
+
+        if show:
+            bokeh.plotting.show(p)
+        else:
+            bokeh.plotting.save(p)
+        return p
+
+    @staticmethod
+    def _downsample(line, method, points):
+        """Rows of a line to draw"""
+        if method is None:
+            return np.arange(len(line))
+        if method == 'lttb':
+            return helpers.lttb(line, points)
+        if method == 'minmax':
+            return helpers.minmax(line, max(points // 4, 1))
+        raise ValueError("Downsample must be 'lttb', 'minmax' or None")
+
+
+class portfolio_backtest():
+    """A backtesting simulation trading several assets from one account."""
+    def __init__(self, datasets, join='inner'):
+        """Initate the backtest.
+
+        :param datasets: HLOCV+ pandas dataframes by symbol, each with a date column
+        :type datasets: dict
+        :param join: 'inner' keeps the dates every asset has, 'outer' keeps all
+            dates and carries the last close forward over missing bars
+        :type join: str
+
+        :return: A bactesting simulation
+        :rtype: portfolio_backtest
+        """
+        if join not in ('inner', 'outer'):
+            raise ValueError("Join must be 'inner' or 'outer'")
+        for symbol, data in datasets.items():
+            if not isinstance(data, pd.DataFrame):
+                raise ValueError("Data for {0} must be a pandas dataframe".format(symbol))
+            missing = set(['date', 'high', 'low', 'open', 'close', 'volume'])-set(data.columns)
+            if len(missing) > 0:
+                msg = "Missing {0} column(s) for {1}, dataframe must be HLOCV+".format(list(missing), symbol)
+                warnings.warn(msg)
+
+        # Shared timeline
+        indexes = [pd.DatetimeIndex(data['date']) for data in datasets.values()]
+        dates = indexes[0]
+        for index in indexes[1:]:
+            dates = dates.intersection(index) if join == 'inner' else dates.union(index)
+        dates = dates.sort_values()
+
+        self.dates = dates
+        self.data = {}
+        for symbol, data in datasets.items():
+            aligned = data.set_index('date').reindex(dates)
+            if join == 'outer':
+                # No trading on a missing bar, the price stays at the last close
+                aligned['close'] = aligned['close'].ffill()
+                for column in ('open', 'high', 'low'):
+                    if column in aligned:
+                        aligned[column] = aligned[column].fillna(aligned['close'])
+                if 'volume' in aligned:
+                    aligned['volume'] = aligned['volume'].fillna(0)
+            self.data[symbol] = aligned.rename_axis('date').reset_index()
+
+    def start(self, initial_capital, logic):
+        """Start backtest.
+
+        :param initial_capital: Starting capital to fund account
+        :type initial_capital: float
+        :param logic: A function called once per date with the account and a dict
+            of :class:`Lookback` views by symbol, positions must be entered with
+            their symbol
+        :type logic: function
+
+        :return: Benchmark and strategy equity and returns indexed by date,
+            the benchmark holds an equal share of every asset from its first close
+        :rtype: pandas.DataFrame
+        """
+        symbols = list(self.data)
+        self.account = exchange.Account(initial_capital)
+        self.account.symbols = symbols
+
+        lookbacks = {s: Lookback(self.data[s]) for s in symbols}
+        dates = list(self.dates)
+        lows = {s: self.data[s]['low'].to_numpy() for s in symbols}
+        highs = {s: self.data[s]['high'].to_numpy() for s in symbols}
+        closes = {s: self.data[s]['close'].to_numpy() for s in symbols}
+
+        # Equal weight buy and hold, each asset bought at its first close
+        # with its share held as cash until then
+        part = initial_capital/len(symbols)
+        benchmark = 0
+        for s in symbols:
+            first = closes[s][np.argmax(~np.isnan(closes[s]))]
+            benchmark = benchmark + np.where(np.isnan(closes[s]), part, part/first*closes[s])
+        tracker = backtest._tracker(benchmark)
+        strategy_equity = tracker[1]
+
+        # Enter backtest ---------------------------------------------
+        for index in range(len(dates)):
+
+            date = dates[index]
+            marks = {s: closes[s][index] for s in symbols}
+            equity = self.account.total_value(marks)
+
+            # Update account variables, stops are hit on this bar
+            self.account.date = date
+
+            # Handle stop loss and take profit
+            for p in self.account.positions:
+                low, high = lows[p.symbol][index], highs[p.symbol][index]
+                if p.type_ == "long":
+                    if p.stop_loss >= low:
+                        self.account.close_position(p, 1.0, low)
+                    elif 0 < p.exit_price <= high:
+                        self.account.close_position(p, 1.0, p.exit_price)
+                if p.type_ == "short":
+                    if p.stop_loss <= high:
+                        self.account.close_position(p, 1.0, high)
+                    elif p.exit_price > 0 and p.exit_price >= low:
+                        self.account.close_position(p, 1.0, p.exit_price)
+
+            self.account.purge_positions()
+
+            # Equity tracking
+            strategy_equity[index] = equity
+            self.account.equity = strategy_equity[:index+1]
+
+            # Execute trading logic
+            for lookback in lookbacks.values():
+                lookback.advance()
+            logic(self.account, lookbacks)
+
+            # Cleanup empty positions
+            self.account.purge_positions()
+
+        # ------------------------------------------------------------
+
+        return backtest._result_frame(self.dates, tracker)
+
+    def results(self):
+        """Print results"""
+        print("-------------- Results ----------------\n")
+        final_prices = {s: data.iloc[-1]['close'] for s, data in self.data.items()}
+        for symbol, data in self.data.items():
+            pc = helpers.percent_change(data['open'].dropna().iloc[0], final_prices[symbol])
+            print("{0:<13}: {1}%".format(symbol, round(pc*100, 2)))
+
+        pc = helpers.percent_change(self.account.initial_capital, self.account.total_value(final_prices))
+        print("Strategy     : {0}%".format(round(pc*100, 2)))
+        print("Net Profit   : {0}".format(round(helpers.profit(self.account.initial_capital, pc), 2)))
+        print("Total Trades : {0}".format(len(self.account.opened_trades) + len(self.account.closed_trades)))
+        print("\n---------------------------------------")
+
+
+
+class stream_backtest():
+    """A backtesting simulation fed bar by bar, holding only a bounded lookback."""
+    def __init__(self, bars=None):
+        """Initate the backtest.
+
+        :param bars: Iterable of bars in date order, each either a mapping of
+            column to value (a dict, a row as a pandas.Series) or a dataframe of
+            consecutive bars, e.g. ``pd.read_csv(path, parse_dates=[0], chunksize=10000)``
+            or :func:`gemini_modules.dataset.iter_chunks`. Bars need date, low,
+            high and close. An iterator can only be backtested once. Leave it
+            out to push bars one at a time with :meth:`step`.
+        :type bars: iterable
+
+        :return: A bactesting simulation
+        :rtype: stream_backtest
+        """
+        self.bars = bars
+
+    @staticmethod
+    def _rows(bars):
+        """Yield every bar as a mapping of column to value"""
+        for bar in bars:
+            if isinstance(bar, pd.DataFrame):
+                columns = {c: bar[c].tolist() for c in bar.columns}
+                for i in range(len(bar)):
+                    yield {c: values[i] for c, values in columns.items()}
+            else:
+                yield bar
+
+    def start(self, initial_capital, logic, max_lookback=None, keep_history=True,
+              on_bar=None):
+        """Start backtest.
+
+        Only the last ``max_lookback`` bars are kept in memory, in a
+        :class:`RingLookback`, along with the date and equity of every bar
+        unless ``keep_history`` is False. What still grows with the data is
+        the account's trade ledgers, one row per trade, and whatever the
+        strategy keeps, e.g. the buypoints and sellpoints of a BaseAlgo.
+
+        :param initial_capital: Starting capital to fund account
+        :type initial_capital: float
+        :param logic: A function that will be applied to each bar, as with
+            :meth:`backtest.start`
+        :type logic: function
+        :param max_lookback: Number of recent bars the logic reads, defaults to
+            the ``max_lookback`` attribute of the strategy the logic is bound to
+        :type max_lookback: int
+        :param keep_history: Keep the date and equity of every bar for
+            :meth:`result`, otherwise only ``peak_equity`` and ``max_drawdown``
+            are kept and ``account.equity`` holds the last equity alone
+        :type keep_history: bool
+        :param on_bar: Called with the date, close and equity of every bar,
+            e.g. to write the equity curve out as it is made
+        :type on_bar: function
+
+        :return: Benchmark and strategy equity and returns indexed by date,
+            None without history
+        :rtype: pandas.DataFrame
+        """
+        self.reset(initial_capital, logic, max_lookback, keep_history, on_bar)
+        for bar in self._rows(self.bars):
+            self.step(bar)
+        return self.result() if keep_history else None
+
+    def reset(self, initial_capital, logic, max_lookback=None, keep_history=True,
+              on_bar=None):
+        """Fund a new account and clear the lookback, ready for :meth:`step`.
+        The parameters are those of :meth:`start`."""
+        if max_lookback is None:
+            max_lookback = getattr(getattr(logic, '__self__', logic), 'max_lookback', None)
+        if max_lookback is None:
+            raise ValueError("Strategy must declare max_lookback to be streamed")
+
+        self.account = exchange.Account(initial_capital)
+        self.logic = logic
+        self.lookback = RingLookback(max_lookback)
+        self.first_open = self.last_close = None
+        self.bars_seen = 0
+        self.keep_history = keep_history
+        self.on_bar = on_bar
+
+        # Running metrics, kept with or without the history
+        self.peak_equity = initial_capital
+        self.max_drawdown = 0.0
+
+        # Dates and equity tracking, doubled in size when full, a single
+        # slot rewritten on every bar without history
+        capacity = 1024 if keep_history else 1
+        self._dates = None  # in the unit of the first date
+        self._tracker = backtest._tracker(np.empty(capacity))
+
+    def step(self, bar):
+        """Run the next bar through the stops and the logic.
+
+        :param bar: Mapping of column to value
+        :type bar: dict
+        """
+        date = bar['date']
+        slot = self.bars_seen if self.keep_history else 0
+        tracker = self._tracker
+        if self._dates is None:
+            unit = pd.Timestamp(date).to_datetime64().dtype
+            self._dates = np.empty(tracker.shape[1], unit)
+        if slot == tracker.shape[1]:
+            tracker = self._tracker = np.concatenate(
+                (tracker, backtest._tracker(np.empty(slot))), axis=1)
+            self._dates = np.concatenate((self._dates, np.empty(slot, self._dates.dtype)))
+
+        low, high, close = bar['low'], bar['high'], bar['close']
+        if self.bars_seen == 0:
+            self.first_open = bar.get('open', close)
+
+        equity = self.account.total_value(close)
+
+        # Update account variables, stops are hit on this bar
+        self.account.date = date
+
+        # Handle stop loss and take profit
+        for p, price in self.account.triggered_positions(low, high):
+            self.account.close_position(p, 1.0, price)
+
+        self.account.purge_positions()
+
+        # Equity tracking
+        self._dates[slot] = date
+        tracker[0, slot] = close
+        tracker[1, slot] = equity
+        self.account.equity = tracker[1, :slot+1]
+        self.peak_equity = max(self.peak_equity, equity)
+        self.max_drawdown = min(self.max_drawdown, equity / self.peak_equity - 1)
+        if self.on_bar is not None:
+            self.on_bar(date, close, equity)
+
+        # Execute trading logic
+        self.lookback.append(bar)
+        self.logic(self.account, self.lookback)
+
+        # Cleanup empty positions
+        self.account.purge_positions()
+
+        self.last_close = close
+        self.bars_seen += 1
+
+    def result(self):
+        """Benchmark and strategy equity and returns of the bars stepped so far.
+
+        :rtype: pandas.DataFrame
+        """
+        if self.bars_seen == 0:
+            raise ValueError("No bars to backtest")
+        if not self.keep_history:
+            raise ValueError("Equity history was not kept, see on_bar")
+        n = self.bars_seen
+        tracker = self._tracker[:, :n].copy()
+        return backtest._result_frame(self._dates[:n].copy(), tracker)
+
+    def results(self):
+        """Print results"""
+        print("-------------- Results ----------------\n")
+        pc = helpers.percent_change(self.first_open, self.last_close)
+        print("Buy and Hold : {0}%".format(round(pc*100, 2)))
+        print("Net Profit   : {0}".format(round(helpers.profit(self.account.initial_capital, pc), 2)))
+
+        pc = helpers.percent_change(self.account.initial_capital, self.account.total_value(self.last_close))
+        print("Strategy     : {0}%".format(round(pc*100, 2)))
+        print("Net Profit   : {0}".format(round(helpers.profit(self.account.initial_capital, pc), 2)))
+
+        longs  = self.account.opened_trades.count('long')
+        sells  = self.account.closed_trades.count('long')
+        shorts = self.account.opened_trades.count('short')
+        covers = self.account.closed_trades.count('short')
+
+        print("Longs        : {0}".format(longs))
+        print("Sells        : {0}".format(sells))
+        print("Shorts       : {0}".format(shorts))
+        print("Covers       : {0}".format(covers))
+        print("--------------------")
+        print("Total Trades : {0}".format(longs + sells + shorts + covers))
+        print("\n---------------------------------------")
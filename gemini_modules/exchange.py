@@ -1,3 +1,8 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
 import gemini_modules.settings as settings
 from gemini_modules.helpers import rnd
 
@@ -9,13 +14,17 @@ class OpenedTrade:
     """
     Open trades main class
     """
+    __slots__ = ('type_', 'date', 'price', 'size', 'fee', 'symbol')
+    FIELDS = ('price', 'size', 'fee')
 
-    def __init__(self, type_, date, price=None, size=None, fee=None):
+    def __init__(self, type_, date, price=None, size=None, fee=None,
+                 symbol=None):
         self.type_ = type_
         self.date = date
         self.price = price
         self.size = size
         self.fee = fee
+        self.symbol = symbol
 
     def __str__(self):
         return "OpenedTrade: {0} {1} {2:.8f} x {3:.8f} Fee: {4:.8f}".format(
@@ -26,9 +35,11 @@ class ClosedTrade(OpenedTrade):
     """
     Closed trade class
     """
+    __slots__ = ('shares', 'entry', 'exit')
+    FIELDS = ('shares', 'entry', 'exit', 'fee')
 
-    def __init__(self, type_, date, shares, entry, exit, fee):
-        super().__init__(type_, date)
+    def __init__(self, type_, date, shares, entry, exit, fee, symbol=None):
+        super().__init__(type_, date, symbol=symbol)
         self.shares = float(shares)
         self.entry = float(entry)  # enter price
         self.exit = float(exit)  # exit price
@@ -40,18 +51,392 @@ class ClosedTrade(OpenedTrade):
                                                 self.exit)
 
 
+class TradeLedger:
+    """
+    Columnar store of trades
+
+    The numeric fields of the trade class go into growable float arrays,
+    and running counts by trade type are kept as trades are added. Reading
+    a trade back builds a record of the trade class.
+    """
+
+    def __init__(self, trade_class=OpenedTrade, capacity=64):
+        self.trade_class = trade_class
+        self.fields = trade_class.FIELDS
+        self.columns = {f: np.full(capacity, np.nan) for f in self.fields}
+        self.type_ = np.zeros(capacity, dtype=np.int16)
+        self.symbol = np.full(capacity, -1, dtype=np.int32)
+        self.dates = []
+        self.types = []  # type names by code
+        self.symbols = []  # symbol names by code
+        self.counts = {}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _code(self, names, name):
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def _grow(self):
+        capacity = len(self.type_)
+        for f in self.fields:
+            self.columns[f] = np.concatenate(
+                (self.columns[f], np.full(capacity, np.nan)))
+        self.type_ = np.concatenate((self.type_, np.zeros(capacity, np.int16)))
+        self.symbol = np.concatenate(
+            (self.symbol, np.full(capacity, -1, np.int32)))
+
+    def add(self, type_, date, symbol=None, **fields):
+        """
+        Record a trade
+        :param type_:
+        :param date:
+        :param symbol:
+        :param fields: numeric fields of the trade class
+        :return:
+        """
+        i = len(self.dates)
+        if i == len(self.type_):
+            self._grow()
+        self.type_[i] = self._code(self.types, type_)
+        self.symbol[i] = -1 if symbol is None else self._code(self.symbols,
+                                                               symbol)
+        for f, value in fields.items():
+            self.columns[f][i] = np.nan if value is None else value
+        self.dates.append(date)
+        self.counts[type_] = self.counts.get(type_, 0) + 1
+
+    def append(self, trade):
+        """
+        Record a trade object
+        :param trade:
+        :return:
+        """
+        self.add(trade.type_, trade.date, trade.symbol,
+                 **{f: getattr(trade, f) for f in self.fields})
+
+    def count(self, type_):
+        """
+        Number of trades of a type
+        :param type_:
+        :return:
+        """
+        return self.counts.get(type_, 0)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Trade index out of range")
+        trade = self.trade_class.__new__(self.trade_class)
+        trade.type_ = self.types[self.type_[i]]
+        trade.date = self.dates[i]
+        code = self.symbol[i]
+        trade.symbol = None if code < 0 else self.symbols[code]
+        trade.price = trade.size = trade.fee = None
+        for f in self.fields:
+            setattr(trade, f, float(self.columns[f][i]))
+        return trade
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_frame(self):
+        """
+        Export the trades as a dataframe, one column per field
+        :return:
+        """
+        n = len(self)
+        df = pd.DataFrame({'date': self.dates})
+        df['type'] = pd.Categorical.from_codes(self.type_[:n], self.types)
+        df['symbol'] = pd.Categorical.from_codes(self.symbol[:n], self.symbols)
+        for f in self.fields:
+            df[f] = self.columns[f][:n]
+        return df
+
+
+class PositionBook:
+    """
+    Struct of arrays store of positions
+
+    One slot per position with its fields held in numpy columns, so marking
+    to market and purging are single array operations. Slots of purged
+    positions are reused by later ones.
+
+    Stop losses and take profit targets (exit_price) are also indexed in one
+    heap per side and kind, ordered so the level crossed first is on top.
+    Entries are removed lazily: one whose position was purged, or whose level
+    was changed since, is dropped when it reaches the top.
+    """
+    TYPES = ('long', 'short', 'None')
+    FLOAT_COLUMNS = ('entry_price', 'shares', 'exit_price', 'stop_loss', 'fee',
+                     'long_weight', 'short_weight')
+    INT_COLUMNS = (('type_', np.int8), ('number', np.int64),
+                   ('symbol', np.int32), ('active', bool))
+
+    def __init__(self, capacity=16):
+        for column, dtype in self.INT_COLUMNS:
+            setattr(self, column, np.zeros(capacity, dtype=dtype))
+        for column in self.FLOAT_COLUMNS:
+            setattr(self, column, np.zeros(capacity))
+        self.symbols = []  # symbol names by code
+        self.count = 0
+        self.shorts = 0
+        self._free = list(range(capacity - 1, -1, -1))
+        # Skip the purge scan when no shares have changed
+        self._may_purge = False
+        # (key, number, slot) entries, keys are negated for the max heaps
+        self._long_stops = []     # max heap, crossed when stop >= low
+        self._short_stops = []    # min heap, crossed when stop <= high
+        self._long_targets = []   # min heap, crossed when target <= high
+        self._short_targets = []  # max heap, crossed when target >= low
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = len(self.active)
+        for column in [c for c, _ in self.INT_COLUMNS] + list(self.FLOAT_COLUMNS):
+            values = getattr(self, column)
+            grown = np.zeros(2 * capacity, dtype=values.dtype)
+            grown[:capacity] = values
+            setattr(self, column, grown)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def changed(self, column, slot):
+        """
+        Note a field written through a Position view
+        :param column:
+        :param slot:
+        :return:
+        """
+        if column == 'shares':
+            self._may_purge = True
+        elif column in ('stop_loss', 'exit_price'):
+            self._index(slot, column)
+
+    def _index(self, slot, column):
+        """
+        Push the stop loss or target of a slot onto its heap
+        :param slot:
+        :param column:
+        :return:
+        """
+        level = float(getattr(self, column)[slot])
+        entry_type = self.type_[slot]
+        number = int(self.number[slot])
+        if column == 'stop_loss':
+            if entry_type == 0 and level > 0:
+                heapq.heappush(self._long_stops, (-level, number, slot))
+            elif entry_type == 1:
+                # A short with the default stop of 0 is stopped out on the
+                # next bar, as before
+                heapq.heappush(self._short_stops, (level, number, slot))
+        elif level > 0:
+            if entry_type == 0:
+                heapq.heappush(self._long_targets, (level, number, slot))
+            elif entry_type == 1:
+                heapq.heappush(self._short_targets, (-level, number, slot))
+
+    def symbol_code(self, symbol):
+        """
+        Integer code of a symbol, -1 for None
+        :param symbol:
+        :return:
+        """
+        if symbol is None:
+            return -1
+        if symbol not in self.symbols:
+            self.symbols.append(symbol)
+        return self.symbols.index(symbol)
+
+    def add(self, type_, number, entry_price, shares, fee=0, exit_price=0,
+            stop_loss=0, symbol=None):
+        """
+        Store a new position
+        :return: slot of the position
+        """
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        code = self.TYPES.index(type_)
+        self.type_[slot] = code
+        self.number[slot] = number
+        self.symbol[slot] = self.symbol_code(symbol)
+        self.entry_price[slot] = entry_price
+        self.shares[slot] = shares
+        self.exit_price[slot] = exit_price
+        self.stop_loss[slot] = stop_loss
+        self.fee[slot] = fee
+        self.long_weight[slot] = code == 0
+        self.short_weight[slot] = code == 1
+        self.active[slot] = True
+        self.count += 1
+        self.shorts += code == 1
+        self._may_purge = self._may_purge or shares <= 0
+        self._index(slot, 'stop_loss')
+        self._index(slot, 'exit_price')
+        return slot
+
+    def slots(self):
+        """
+        Slots of the stored positions in the order they were entered
+        :return:
+        """
+        slots = np.flatnonzero(self.active)
+        return slots[np.argsort(self.number[slots], kind='stable')]
+
+    def value(self, current_price):
+        """
+        Value of the stored positions
+
+        :param current_price: price of the traded asset, or an array of
+            prices indexed by symbol code
+        :return:
+        """
+        if self.count == 0:
+            return 0.0
+        if np.ndim(current_price) > 0:
+            current_price = current_price[self.symbol]
+            value = np.dot(self.shares * self.long_weight, current_price)
+        else:
+            value = np.dot(self.shares, self.long_weight) * current_price
+        if self.shorts > 0:
+            value += np.dot(self.shares * self.short_weight,
+                            self.entry_price - current_price + self.entry_price)
+        return float(value)
+
+    def _valid(self, entry, column):
+        """Whether a heap entry still describes a live position"""
+        key, number, slot = entry
+        return (self.active[slot] and self.number[slot] == number
+                and self.shares[slot] > 0
+                and getattr(self, column)[slot] == abs(key))
+
+    def triggered(self, low, high):
+        """
+        Positions whose stop loss or target was crossed by a bar
+
+        Longs are stopped at the low when their stop is at or above it and
+        take profit at their target when the high reaches it, shorts the
+        other way round. A stop wins over a target crossed in the same bar.
+        Only heap entries that were crossed are touched, and they are popped,
+        so the positions returned are expected to be closed.
+
+        :param low:
+        :param high:
+        :return: (slot, price) pairs in the order the positions were entered
+        """
+        hits = {}
+        for heap, crossed, column, price in (
+                (self._long_stops, lambda key: -key >= low, 'stop_loss', low),
+                (self._short_stops, lambda key: key <= high, 'stop_loss', high),
+                (self._long_targets, lambda key: key <= high, 'exit_price', None),
+                (self._short_targets, lambda key: -key >= low, 'exit_price', None)):
+            while heap and crossed(heap[0][0]):
+                entry = heapq.heappop(heap)
+                if self._valid(entry, column) and entry[2] not in hits:
+                    hits[entry[2]] = (entry[1], abs(entry[0]) if price is None else price)
+        return [(slot, price) for slot, (number, price)
+                in sorted(hits.items(), key=lambda item: item[1][0])]
+
+    def _compact(self):
+        """Drop stale heap entries once they outnumber the live ones"""
+        for name, column in (('_long_stops', 'stop_loss'),
+                             ('_short_stops', 'stop_loss'),
+                             ('_long_targets', 'exit_price'),
+                             ('_short_targets', 'exit_price')):
+            heap = getattr(self, name)
+            if len(heap) > 2 * self.count + 32:
+                heap = [e for e in heap if self._valid(e, column)]
+                heapq.heapify(heap)
+                setattr(self, name, heap)
+
+    def purge(self):
+        """
+        Free the slots of positions without shares
+        :return: freed slots
+        """
+        if not self._may_purge:
+            return []
+        self._may_purge = False
+        empty = np.flatnonzero(self.active & (self.shares <= 0))
+        if len(empty) > 0:
+            self.shorts -= int(self.short_weight[empty].sum())
+            self.active[empty] = False
+            self.long_weight[empty] = 0
+            self.short_weight[empty] = 0
+            self.count -= len(empty)
+            self._free.extend(empty[::-1].tolist())
+            self._compact()
+        return empty
+
+
+def _column(name):
+    """Position attribute stored in a PositionBook column"""
+    def get(self):
+        return float(getattr(self._book, name)[self._slot])
+
+    def set(self, value):
+        getattr(self._book, name)[self._slot] = value
+        self._book.changed(name, self._slot)
+
+    return property(get, set)
+
+
 class Position:
     """
     Position main class
-    """
 
-    def __init__(self, number, entry_price, shares, exit_price=0, stop_loss=0):
-        self.number = number
-        self.type_ = "None"
-        self.entry_price = float(entry_price)
-        self.shares = float(shares)
-        self.exit_price = float(exit_price)
-        self.stop_loss = float(stop_loss)
+    A lightweight view of one slot of a PositionBook. Positions created
+    directly get a book of their own.
+    """
+    __slots__ = ('_book', '_slot')
+    _type = 'None'
+
+    def __init__(self, number, entry_price, shares, exit_price=0, stop_loss=0,
+                 symbol=None, fee=0):
+        self._book = PositionBook(1)
+        self._slot = self._book.add(self._type, number, float(entry_price),
+                                    float(shares), fee, float(exit_price),
+                                    float(stop_loss), symbol)
+
+    @classmethod
+    def view(cls, book, slot):
+        """
+        Position stored in a slot of a book
+        :param book:
+        :param slot:
+        :return:
+        """
+        position = cls.__new__(cls)
+        position._book = book
+        position._slot = slot
+        return position
+
+    entry_price = _column('entry_price')
+    shares = _column('shares')
+    exit_price = _column('exit_price')
+    stop_loss = _column('stop_loss')
+    fee = _column('fee')
+
+    @property
+    def number(self):
+        return int(self._book.number[self._slot])
+
+    @property
+    def type_(self):
+        return PositionBook.TYPES[self._book.type_[self._slot]]
+
+    @property
+    def symbol(self):
+        code = self._book.symbol[self._slot]
+        return None if code < 0 else self._book.symbols[code]
 
     def show(self):
         """
@@ -59,6 +444,8 @@ class Position:
         :return:
         """
         print("No. {0}".format(self.number))
+        if self.symbol is not None:
+            print("Symbol: {0}".format(self.symbol))
         print("Type:   {0}".format(self.type_))
         print("Entry:  {0}".format(self.entry_price))
         print("Shares: {0}".format(self.shares))
@@ -73,12 +460,13 @@ class LongPosition(Position):
     """
     Long position class
     """
+    __slots__ = ()
+    _type = 'long'
 
     def __init__(self, number, entry_price, shares, fee, exit_price=0,
-                 stop_loss=0):
-        super().__init__(number, entry_price, shares, exit_price, stop_loss)
-        self.type_ = 'long'
-        self.fee = fee
+                 stop_loss=0, symbol=None):
+        super().__init__(number, entry_price, shares, exit_price, stop_loss,
+                         symbol, fee)
 
     def close(self, percent, current_price):
         """
@@ -97,12 +485,13 @@ class ShortPosition(Position):
     """
     Short position class
     """
+    __slots__ = ()
+    _type = 'short'
 
     def __init__(self, number, entry_price, shares, fee, exit_price=0,
-                 stop_loss=0):
-        super().__init__(number, entry_price, shares, exit_price, stop_loss)
-        self.type_ = 'short'
-        self.fee = fee
+                 stop_loss=0, symbol=None):
+        super().__init__(number, entry_price, shares, exit_price, stop_loss,
+                         symbol, fee)
 
     def close(self, percent, current_price):
         """
@@ -128,6 +517,7 @@ class Account:
     Store settings and trades data
     """
     fee = FEES
+    symbols = None  # symbols positions must name, set when trading several
 
     def __init__(self, initial_capital, fee=None):
         self.initial_capital = initial_capital
@@ -135,14 +525,25 @@ class Account:
         self.number = 0
         self.date = None
         self.equity = []
-        self.positions = []
-        self.opened_trades = []
-        self.closed_trades = []
+        self.book = PositionBook()
+        self._views = {}  # Position view by book slot
+        self.opened_trades = TradeLedger(OpenedTrade)
+        self.closed_trades = TradeLedger(ClosedTrade)
         if isinstance(fee, dict):
             self.fee = fee
 
+    @property
+    def positions(self):
+        """
+        Open positions in the order they were entered
+        :return:
+        """
+        if len(self.book) == 0:
+            return []
+        return [self._views[slot] for slot in self.book.slots()]
+
     def enter_position(self, type_, entry_capital, entry_price, exit_price=0,
-                       stop_loss=0):
+                       stop_loss=0, symbol=None):
         """
         Open position
         :param type_:
@@ -150,6 +551,7 @@ class Account:
         :param entry_price:
         :param exit_price:
         :param stop_loss:
+        :param symbol: asset traded, only needed when trading several
         :return:
         """
         if entry_capital < 0:
@@ -158,6 +560,9 @@ class Account:
             raise ValueError("Error: Entry price cannot be negative.")
         elif self.buying_power < entry_capital:
             raise ValueError("Error: Not enough buying power to enter position")
+        elif self.symbols is not None and symbol not in self.symbols:
+            raise ValueError("Error: Symbol must be one of {0}, not {1}".format(
+                list(self.symbols), symbol))
         else:
             # apply fee to price
             price_with_fee = self.apply_fee(entry_price, type_, 'Open')
@@ -172,21 +577,19 @@ class Account:
             self.buying_power -= pos_amount + trade_fee
 
             if type_ == 'long':
-                position = LongPosition(
-                    self.number, entry_price, size, trade_fee, exit_price,
-                    stop_loss)
+                view = LongPosition.view
 
             elif type_ == 'short':
-                position = ShortPosition(
-                    self.number, entry_price, size, trade_fee, exit_price,
-                    stop_loss)
+                view = ShortPosition.view
 
             else:
                 raise TypeError("Invalid position type.")
 
-            self.positions.append(position)
-            self.opened_trades.append(
-                OpenedTrade(type_, self.date, entry_price, size, trade_fee))
+            slot = self.book.add(type_, self.number, entry_price, size,
+                                 trade_fee, exit_price, stop_loss, symbol)
+            self._views[slot] = view(self.book, slot)
+            self.opened_trades.add(type_, self.date, symbol, price=entry_price,
+                                   size=size, fee=trade_fee)
             self.number += 1
 
     def close_position(self, position, percent, price):
@@ -214,10 +617,10 @@ class Account:
             trade_fee = rnd(
                 price * position.shares * self.fee.get(position.type_, 0))
 
-            self.closed_trades.append(
-                ClosedTrade(position.type_, self.date,
-                            position.shares * percent,
-                            position.entry_price, price, trade_fee))
+            self.closed_trades.add(position.type_, self.date, position.symbol,
+                                   shares=position.shares * percent,
+                                   entry=position.entry_price, exit=price,
+                                   fee=trade_fee)
             self.buying_power += position.close(percent, price) - trade_fee
 
     def apply_fee(self, price, type_, direction):
@@ -257,7 +660,19 @@ class Account:
 
         # FIXME Fix to remove positions on close
 
-        self.positions = [p for p in self.positions if p.shares > 0]
+        for slot in self.book.purge():
+            del self._views[slot]
+
+    def triggered_positions(self, low, high):
+        """
+        Positions whose stop loss or take profit target (exit_price) was
+        crossed by a bar, with the price to close them at
+        :param low:
+        :param high:
+        :return: list of (position, price)
+        """
+        return [(self._views[slot], price)
+                for slot, price in self.book.triggered(low, high)]
 
     def show_positions(self):
         """
@@ -271,16 +686,16 @@ class Account:
         """
         Return total balance with open positions
 
-        :param current_price:
+        :param current_price: price of the traded asset, or a dict of
+            prices by symbol when trading several
         :return:
         """
         # print(self.buying_power)
         # for p in self.positions: print(p)  # positions
         # for ot in self.opened_trades: print(ot)  # open trades
-        in_pos = sum(
-            [p.shares * current_price for p in self.positions
-             if p.type_ == 'long']) + sum(
-            [p.shares * (p.entry_price - current_price + p.entry_price)
-             for p in self.positions
-             if p.type_ == 'short'])
-        return self.buying_power + in_pos
+        if isinstance(current_price, dict):
+            # Marks by symbol code, positions without a symbol get nan
+            current_price = np.array(
+                [current_price.get(s, np.nan) for s in self.book.symbols]
+                + [np.nan])
+        return self.buying_power + self.book.value(current_price)
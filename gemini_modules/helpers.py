@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def percent_change(d1, d2):
     """Calculate percent change between two numbers.
 
@@ -37,6 +39,75 @@ def rnd(value, prec=8):
     rounded = math.ceil(value * round_prec)
     return rounded / round_prec
 
+def lttb(y, threshold, x=None):
+    """Largest triangle three buckets downsampling of a line.
+
+    Keeps the first and last points and, from each of the buckets in
+    between, the point forming the largest triangle with the point kept
+    from the previous bucket and the average of the next one.
+
+    :param y: Values of the line
+    :type y: numpy.ndarray
+    :param threshold: Number of points to keep
+    :type threshold: int
+    :param x: Positions of the values, evenly spaced by default
+    :type x: numpy.ndarray
+
+    :return: Sorted row numbers of the points kept
+    :rtype: numpy.ndarray
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x).astype(float)
+
+    # Bucket i spans edges[i]:edges[i+1], the first and last points are alone
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        following = slice(end, edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[a] - avg_x)*(y[start:end] - y[a])
+                      - (x[a] - x[start:end])*(avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+def minmax(y, buckets):
+    """Min/max downsampling of a line.
+
+    Splits the line into equal buckets, one per pixel column say, and keeps
+    the first, lowest, highest and last point of each, so every spike is
+    still drawn.
+
+    :param y: Values of the line
+    :type y: numpy.ndarray
+    :param buckets: Number of buckets, at most four points are kept of each
+    :type buckets: int
+
+    :return: Sorted row numbers of the points kept
+    :rtype: numpy.ndarray
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 4 * buckets >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lowest = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1) + offsets
+    highest = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1) + offsets
+    last = np.minimum(offsets + size, n) - 1
+    kept = np.unique(np.concatenate((offsets, lowest, highest, last)))
+    return kept[kept < n]
+
 class period():
     """An object representing a period of time."""
     def __init__(self, data):
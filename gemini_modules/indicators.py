@@ -0,0 +1,223 @@
+from collections import OrderedDict, deque
+import math
+import operator
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from gemini_modules.lookback import Lookback
+
+
+class RollingExtremum:
+    """
+    Streaming rolling extremum of a column
+
+    Keeps a monotonic deque of (index, value) pairs so that each update is
+    amortized O(1) and the extremum of the window is always at the front.
+    """
+
+    def __init__(self, column, window, dominates):
+        """
+        :param column: Lookback column fed into the indicator
+        :param window: Number of bars in the rolling window
+        :param dominates: Comparison true when a kept value stays the
+            extremum over a newer one, e.g. ``operator.lt`` for a minimum
+        """
+        if window < 1:
+            raise ValueError("Error: Window must be at least one bar.")
+        self.column = column
+        self.window = window
+        self._dominates = dominates
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all bars seen so far
+        :return:
+        """
+        self.count = 0
+        self._last_nan = -1
+        self._queue = deque()
+
+    def update(self, value):
+        """
+        Push the next bar's value into the window
+        :param value:
+        :return:
+        """
+        queue = self._queue
+        if value != value:
+            # Like pandas, a NaN anywhere in the window gives a NaN
+            self._last_nan = self.count
+        else:
+            while queue and not self._dominates(queue[-1][1], value):
+                queue.pop()
+            queue.append((self.count, value))
+        self.count += 1
+        while queue and queue[0][0] <= self.count - 1 - self.window:
+            queue.popleft()
+
+    @property
+    def value(self):
+        """
+        Extremum of the last window values, nan until the window is full
+        :return:
+        """
+        if (self.count < self.window or not self._queue
+                or self._last_nan >= self.count - self.window):
+            return math.nan
+        return self._queue[0][1]
+
+
+class RollingMin(RollingExtremum):
+    """
+    Streaming equivalent of ``series.rolling(window).min()``
+    """
+
+    def __init__(self, column, window):
+        super().__init__(column, window, operator.lt)
+
+
+class RollingMax(RollingExtremum):
+    """
+    Streaming equivalent of ``series.rolling(window).max()``
+    """
+
+    def __init__(self, column, window):
+        super().__init__(column, window, operator.gt)
+
+
+# Rolling functions the cache can compute, by name
+ROLLING_FUNCTIONS = ('min', 'max', 'mean', 'sum', 'std', 'median')
+
+
+class IndicatorCache:
+    """
+    Least recently used cache of full-length rolling indicator arrays
+
+    Entries are keyed by dataset, column, window and function. A dataset is
+    a dataframe, identified by the object itself; its entries are dropped
+    when it is garbage collected, and it is assumed not to be modified in
+    place. Lookbacks share the entries of the dataframe they view and get
+    the leading slice, since a rolling value only depends on earlier rows.
+    Returned arrays are read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        """
+        :param max_bytes: memory budget, least recently used arrays are
+            evicted beyond it
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._watched = set()
+
+    def _dataset_key(self, data):
+        key = id(data)
+        if key not in self._watched:
+            self._watched.add(key)
+            weakref.finalize(data, self.drop_dataset, key)
+        return key
+
+    def drop_dataset(self, key):
+        """
+        Forget every entry of a dataset
+        :param key:
+        :return:
+        """
+        self._watched.discard(key)
+        for entry in [k for k in self._entries if k[0] == key]:
+            self.nbytes -= self._entries.pop(entry).nbytes
+
+    def rolling(self, data, column, window, function):
+        """
+        Rolling function of a column, computed once per dataset
+
+        :param data: dataframe or Lookback
+        :param column:
+        :param window:
+        :param function: one of ROLLING_FUNCTIONS
+        :return: read-only array as long as data, or uncached over the bars
+            held by a RingLookback
+        """
+        if function not in ROLLING_FUNCTIONS:
+            raise ValueError("Error: Unknown rolling function {0}".format(function))
+        length = len(data)
+        source = data.source if isinstance(data, Lookback) else data
+        if source is None:
+            # A RingLookback has no dataframe behind it to share
+            rolling = pd.Series(data.values(column)).rolling(window)
+            return getattr(rolling, function)().to_numpy()
+
+        key = (self._dataset_key(source), column, window, function)
+        values = self._entries.get(key)
+        if values is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            rolling = pd.Series(np.asarray(source[column], dtype=float)).rolling(window)
+            values = getattr(rolling, function)().to_numpy()
+            values.flags.writeable = False
+            self._store(key, values)
+        return values[:length]
+
+    def _store(self, key, values):
+        if values.nbytes > self.max_bytes:
+            return
+        self._entries[key] = values
+        self.nbytes += values.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every entry and reset the statistics
+        :return:
+        """
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Hit/miss statistics
+        :return: dict
+        """
+        lookups = self.hits + self.misses
+        return {'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+# Cache shared by the strategies in this process
+cache = IndicatorCache()
+
+
+def rolling(data, column, window, function):
+    """
+    Rolling function of a column from the shared cache, e.g.
+    ``rolling(lookback, 'low', 20, 'min')`` for
+    ``lookback['low'].rolling(window=20).min()``
+    """
+    return cache.rolling(data, column, window, function)
+
+
+def ta_function(name):
+    """
+    TA-Lib abstract function by name, e.g. ``ta_function('SMA')(lookback.to_frame())``.
+    TA-Lib is only imported the first time one is asked for, as it is slow
+    to import and not always installed.
+    """
+    from talib import abstract
+    return abstract.Function(name)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Local imorts
+from gemini_modules import dataset, engine
+
+# Quantiles of the per bar decision latency reported by paper_trader
+LATENCY_QUANTILES = [0.5, 0.95, 0.99]
+
+
+def _bar_line(columns, i, symbol):
+    bar = {'symbol': symbol}
+    for column, values in columns.items():
+        value = values[i]
+        if isinstance(value, np.datetime64):
+            bar[column] = str(value)
+        else:
+            bar[column] = float(value)
+    return (json.dumps(bar) + '\n').encode()
+
+
+async def replay_server(directory='data', host='127.0.0.1', port=0, speed=None):
+    """
+    Serve data/USDT_<symbol>.csv files over a socket, as a stand in for a
+    live feed when paper trading offline.
+
+    A client sends a symbol followed by a newline and is sent every bar of
+    that symbol as one json object per line, then the connection is closed.
+    Floats round trip exactly, so a replay trades exactly like a backtest.
+
+    :param directory: folder holding the csv files
+    :param host:
+    :param port: 0 picks a free port, see ``server.sockets[0].getsockname()``
+    :param speed: bars per second per client, None streams as fast as the
+        client reads
+    :return: asyncio.Server, already serving
+    """
+    async def handle(reader, writer):
+        try:
+            symbol = (await reader.readline()).decode().strip()
+            path = os.path.join(directory, "USDT_{0}.csv".format(symbol))
+            if not os.path.isfile(path):
+                error = {'error': "Unknown symbol {0}".format(symbol)}
+                writer.write((json.dumps(error) + '\n').encode())
+                return
+
+            columns = dataset.load_columns(path)
+            rows = len(next(iter(columns.values())))
+            for i in range(rows):
+                writer.write(_bar_line(columns, i, symbol))
+                if speed is not None:
+                    await writer.drain()
+                    await asyncio.sleep(1 / speed)
+                elif i % 256 == 255:
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def replay_feed(symbol, host='127.0.0.1', port=None):
+    """
+    Async iterator over the bars of a symbol from a :func:`replay_server`
+
+    :param symbol:
+    :param host:
+    :param port:
+    :return: bars as dicts, dates as pandas.Timestamp
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((symbol + '\n').encode())
+        await writer.drain()
+        async for line in reader:
+            bar = json.loads(line)
+            if 'error' in bar:
+                raise ValueError("Error: {0}".format(bar['error']))
+            bar['date'] = pd.Timestamp(bar['date'])
+            yield bar
+    finally:
+        writer.close()
+
+
+class paper_trader():
+    """Runs strategies against simulated accounts as bars arrive from async
+    sources, every symbol in the same event loop."""
+    def __init__(self):
+        """Initiate the trader, add feeds with :meth:`add`.
+
+        :return: A paper trader
+        :rtype: paper_trader
+        """
+        self.feeds = {}
+
+    def add(self, symbol, source, logic, initial_capital, max_lookback=None):
+        """Trade a symbol.
+
+        Each symbol has its own account and a bounded lookback, the bars are
+        handled as in :class:`engine.stream_backtest`, so the same ``logic``
+        functions can be used.
+
+        :param symbol: Name of the feed
+        :type symbol: str
+        :param source: Async iterable of bars, e.g. :func:`replay_feed`
+        :param logic: A function called with the account and lookback on every bar
+        :type logic: function
+        :param initial_capital: Starting capital to fund the account
+        :type initial_capital: float
+        :param max_lookback: Number of recent bars the logic reads, defaults to
+            the ``max_lookback`` attribute of its strategy
+        :type max_lookback: int
+        """
+        simulation = engine.stream_backtest()
+        simulation.reset(initial_capital, logic, max_lookback)
+        self.feeds[symbol] = {'source': source, 'simulation': simulation,
+                              'latency': []}
+
+    def account(self, symbol):
+        """Simulated account trading a symbol"""
+        return self.feeds[symbol]['simulation'].account
+
+    async def _trade(self, feed):
+        simulation = feed['simulation']
+        latency = feed['latency']
+        clock = time.perf_counter
+        async for bar in feed['source']:
+            # Time from the bar arriving to the decision being made
+            started = clock()
+            simulation.step(bar)
+            latency.append(clock() - started)
+
+    async def run(self):
+        """Trade every feed until all of them end.
+
+        :return: Equity curves by symbol, as returned by a backtest
+        :rtype: dict
+        """
+        await asyncio.gather(*(self._trade(feed) for feed in self.feeds.values()))
+        return {symbol: feed['simulation'].result()
+                for symbol, feed in self.feeds.items()}
+
+    def latency(self):
+        """Per bar decision latency by symbol.
+
+        :return: Bars, mean, quantiles and max, in seconds
+        :rtype: pandas.DataFrame
+        """
+        rows = {}
+        for symbol, feed in self.feeds.items():
+            latency = np.array(feed['latency'])
+            row = {'bars': len(latency)}
+            row['mean'] = latency.mean() if len(latency) else np.nan
+            for q in LATENCY_QUANTILES:
+                row['p{0:g}'.format(q*100)] = np.quantile(latency, q) if len(latency) else np.nan
+            row['max'] = latency.max() if len(latency) else np.nan
+            rows[symbol] = row
+        df = pd.DataFrame.from_dict(rows, orient='index')
+        df.index.name = 'symbol'
+        return df
+
+    def results(self):
+        """Print the latency and the results of every symbol"""
+        for symbol, feed in self.feeds.items():
+            print(symbol)
+            feed['simulation'].results()
+        print(self.latency().to_string(float_format=lambda x: "{0:.6g}".format(x)))
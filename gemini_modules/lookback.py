@@ -0,0 +1,342 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+
+class Lookback:
+    """
+    Expanding window over a HLOCV+ dataframe.
+
+    The column arrays are pulled out of the dataframe once and every
+    access returns a read-only view of the rows seen so far, so growing
+    the window by one bar is just moving the end pointer.
+    """
+
+    def __init__(self, data, end=0):
+        """Initiate the lookback.
+
+        :param data: An HLOCV+ pandas dataframe
+        :type data: pandas.DataFrame
+        :param end: Number of rows initially visible
+        :type end: int
+        """
+        self.source = data
+        self._index = data.index
+        self._columns = {}
+        for column in data.columns:
+            values = data[column].to_numpy().view()
+            values.flags.writeable = False
+            self._columns[column] = values
+        self._extra = {}
+        self._end = end
+        self._timeframes = {}
+
+    def advance(self, n=1):
+        """
+        Expose the next n rows
+        :param n:
+        :return:
+        """
+        if self._end + n > len(self._index):
+            raise IndexError("Error: Cannot look past the end of the data.")
+        self._end += n
+        # Columns assigned by strategies only describe the previous window
+        self._extra = {}
+
+    def __len__(self):
+        return self._end
+
+    @property
+    def start(self):
+        """Row number of the first bar still held"""
+        return 0
+
+    def __contains__(self, column):
+        return column in self._extra or column in self._columns
+
+    @property
+    def columns(self):
+        return list(self._columns) + [c for c in self._extra
+                                      if c not in self._columns]
+
+    @property
+    def index(self):
+        return self._index[:self._end]
+
+    def values(self, column):
+        """
+        Return read-only array view of a column
+        :param column:
+        :return:
+        """
+        return self._columns[column][:self._end]
+
+    def timeframe(self, freq):
+        """
+        Bars of a higher timeframe, e.g. '4h' or '1D', aggregated from the
+        bars seen so far. The aggregation is kept between calls and only
+        the new bars are added, so a call costs O(1) per new bar.
+        :param freq: fixed frequency
+        :return: TimeframeLookback whose last bar is still forming
+        """
+        if freq not in self._timeframes:
+            self._timeframes[freq] = TimeframeLookback(self, freq)
+        bars = self._timeframes[freq]
+        bars.update()
+        return bars
+
+    def attach_timeframes(self, timeframes):
+        """
+        Carry on aggregating timeframes saved from a lookback over the start
+        of the same data, see :meth:`TimeframeLookback.__getstate__`
+        :param timeframes: dict of TimeframeLookback by frequency
+        :return:
+        """
+        for bars in timeframes.values():
+            bars.base = self
+        self._timeframes = timeframes
+
+    @property
+    def date(self):
+        return self.values('date')
+
+    @property
+    def open(self):
+        return self.values('open')
+
+    @property
+    def high(self):
+        return self.values('high')
+
+    @property
+    def low(self):
+        return self.values('low')
+
+    @property
+    def close(self):
+        return self.values('close')
+
+    @property
+    def volume(self):
+        return self.values('volume')
+
+    def __getitem__(self, column):
+        if column in self._extra:
+            return self._extra[column]
+        return pd.Series(self.values(column), index=self.index, name=column,
+                         copy=False)
+
+    def __setitem__(self, column, value):
+        if np.ndim(value) == 0:
+            value = np.full(len(self.index), value)
+        if not isinstance(value, pd.Series):
+            value = pd.Series(value, index=self.index, name=column)
+        self._extra[column] = value
+
+    def to_frame(self):
+        """
+        Return the visible rows as a dataframe
+        :return:
+        """
+        frame = pd.DataFrame({c: self.values(c) for c in self._columns},
+                             index=self.index)
+        for column, value in self._extra.items():
+            frame[column] = value
+        return frame
+
+
+def _buffer_dtype(value):
+    if isinstance(value, (datetime.datetime, np.datetime64)):
+        return np.dtype('datetime64[ns]')
+    dtype = np.asarray(value).dtype
+    return np.dtype(float) if dtype.kind in 'biuf' else np.dtype(object)
+
+
+class RingLookback(Lookback):
+    """
+    Lookback over a stream of bars holding only the most recent ones.
+
+    Every bar is written twice into a buffer of twice the capacity, at its
+    slot and one capacity further on, so the bars held are always a
+    contiguous view and appending never copies. ``len`` counts every bar
+    appended and the index holds their row numbers, so ``lookback['close'][today]``
+    works as with a :class:`Lookback`, but only the last ``capacity`` rows
+    can be read.
+    """
+
+    def __init__(self, capacity):
+        """Initiate the lookback.
+
+        :param capacity: Number of recent bars held
+        :type capacity: int
+        """
+        if capacity < 1:
+            raise ValueError("Error: Capacity must be at least one bar.")
+        self.source = None
+        self.capacity = capacity
+        self._columns = {}
+        self._extra = {}
+        self._end = 0
+        self._timeframes = {}
+
+    def append(self, bar):
+        """
+        Add the next bar, dropping the oldest one once full
+        :param bar: mapping of column to value, the columns of the first
+            bar are kept
+        :return:
+        """
+        if len(self._columns) == 0:
+            for column, value in bar.items():
+                self._columns[column] = np.empty(2 * self.capacity,
+                                                 _buffer_dtype(value))
+        slot = self._end % self.capacity
+        for column, buffer in self._columns.items():
+            buffer[slot] = buffer[slot + self.capacity] = bar[column]
+        self._end += 1
+        # Columns assigned by strategies only describe the previous window
+        self._extra = {}
+
+    def advance(self, n=1):
+        raise IndexError("Error: A ring lookback only grows with append.")
+
+    @property
+    def start(self):
+        return max(self._end - self.capacity, 0)
+
+    @property
+    def index(self):
+        return pd.RangeIndex(self.start, self._end)
+
+    def values(self, column):
+        """
+        Return read-only array view of the bars held of a column
+        :param column:
+        :return:
+        """
+        first = self.start % self.capacity
+        values = self._columns[column][first:first + self._end - self.start]
+        values.flags.writeable = False
+        return values
+
+
+def timeframe_bins(dates, freq):
+    """
+    Start of the bar of a fixed frequency each date falls in, as epoch
+    nanoseconds. Bars are aligned to the epoch, which for frequencies that
+    divide a day matches ``DataFrame.resample``.
+    :param dates: datetime64 array
+    :param freq: e.g. '4h' or '1D'
+    :return: int64 array
+    """
+    step = pd.Timedelta(freq).value
+    if step <= 0:
+        raise ValueError("Error: Timeframe must be positive.")
+    nanoseconds = np.asarray(dates).astype('datetime64[ns]').view('int64')
+    return nanoseconds - nanoseconds % step
+
+
+class TimeframeLookback(Lookback):
+    """
+    Higher timeframe bars of a lookback, see :meth:`Lookback.timeframe`.
+
+    Each base bar either extends the last bar, raising its high, lowering
+    its low, replacing its close and adding its volume, or starts a new
+    bar. Periods without base bars are left out rather than filled.
+    """
+
+    # How each column is aggregated, other columns are left out
+    AGGREGATE = {'open': 'first', 'high': 'max', 'low': 'min',
+                 'close': 'last', 'volume': 'sum'}
+
+    def __init__(self, base, freq, capacity=64):
+        """Initiate the lookback.
+
+        :param base: Lookback of the base bars, with a date column
+        :type base: Lookback
+        :param freq: Fixed frequency of the bars, e.g. '4h'
+        :type freq: str
+        """
+        self.base = base
+        self.freq = freq
+        self.step = pd.Timedelta(freq).value
+        self.source = None
+        columns = ['date'] + [c for c in self.AGGREGATE if c in base]
+        self._columns = {c: np.empty(capacity, 'datetime64[ns]' if c == 'date' else float)
+                         for c in columns}
+        self._extra = {}
+        self._end = 0
+        self._timeframes = {}
+        self._seen = 0  # base bars aggregated
+
+    def advance(self, n=1):
+        raise IndexError("Error: A timeframe lookback follows its base lookback.")
+
+    def __getstate__(self):
+        # The base views the dataset, so it is left out and attached again
+        return dict(self.__dict__, base=None, _extra={})
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for bars in self._timeframes.values():
+            bars.base = self
+
+    def _grow(self):
+        for column, values in self._columns.items():
+            grown = np.empty(2 * len(values), values.dtype)
+            grown[:self._end] = values[:self._end]
+            self._columns[column] = grown
+
+    def update(self):
+        """
+        Aggregate the base bars that arrived since the last update
+        :return:
+        """
+        base = self.base
+        start, stop = base.start, len(base)
+        if stop <= self._seen:
+            if stop < self._seen:
+                raise ValueError("Error: The base lookback went backwards.")
+            return
+        if self._seen < start:
+            raise ValueError("Error: Base bars were dropped before being aggregated.")
+
+        new = slice(self._seen - start, stop - start)
+        bins = timeframe_bins(base.values('date')[new], self.freq)
+        values = {c: base.values(c)[new] for c in self._columns if c != 'date'}
+        columns = self._columns
+        for i, bin_ in enumerate(bins):
+            last = self._end - 1
+            if last < 0 or bin_ != columns['date'][last].view('int64'):
+                if self._end == len(columns['date']):
+                    self._grow()
+                    columns = self._columns
+                last = self._end
+                self._end += 1
+                columns['date'][last] = np.int64(bin_).view('datetime64[ns]')
+                for column, series in values.items():
+                    columns[column][last] = series[i]
+                continue
+            for column, series in values.items():
+                how = self.AGGREGATE[column]
+                if how == 'max':
+                    columns[column][last] = np.fmax(columns[column][last], series[i])
+                elif how == 'min':
+                    columns[column][last] = np.fmin(columns[column][last], series[i])
+                elif how == 'last':
+                    columns[column][last] = series[i]
+                elif how == 'sum':
+                    columns[column][last] += series[i]
+        self._seen = stop
+        # Columns assigned by strategies only describe the previous bars
+        self._extra = {}
+
+    @property
+    def index(self):
+        return pd.RangeIndex(0, self._end)
+
+    def values(self, column):
+        values = self._columns[column][:self._end]
+        values.flags.writeable = False
+        return values
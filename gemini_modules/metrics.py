@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Used when the bar length cannot be inferred from the dates
+PERIODS_PER_YEAR = 365 * 48  # 30 minute bars, crypto trades every day
+
+# Elements per block when computing rolling drawdowns
+BLOCK_SIZE = 2**22
+
+
+class Metrics:
+    """
+    Performance of a backtest, see :func:`compute`
+
+    Returns are fractions, volatility, Sharpe and Sortino are annualised,
+    the drawdown duration is in bars and the round trip figures come from
+    the closed trades.
+    """
+    __slots__ = ('total_return', 'benchmark_return', 'volatility', 'sharpe',
+                 'sortino', 'max_drawdown', 'max_drawdown_duration',
+                 'exposure', 'turnover', 'round_trips', 'win_rate', 'avg_win',
+                 'avg_loss', 'profit_factor', 'pnl', 'fees')
+    FIELDS = __slots__
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values[field])
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def to_series(self):
+        return pd.Series(self.to_dict())
+
+    def __repr__(self):
+        return "Metrics({0})".format(", ".join(
+            "{0}={1:.6g}".format(field, getattr(self, field)) for field in self.FIELDS))
+
+
+def periods_per_year(dates):
+    """
+    Bars per year from the median spacing of the dates
+    :param dates:
+    :return:
+    """
+    dates = np.asarray(dates).astype('datetime64[ns]').view('int64')
+    if len(dates) < 2:
+        return PERIODS_PER_YEAR
+    spacing = np.median(np.diff(dates))
+    if spacing <= 0:
+        return PERIODS_PER_YEAR
+    return pd.Timedelta('365D').value / spacing
+
+
+def drawdown(equity):
+    """
+    Fall of the equity from its running peak on every bar
+    :param equity:
+    :return: array of fractions, zero or negative
+    """
+    equity = np.asarray(equity, dtype=float)
+    return equity / np.maximum.accumulate(equity) - 1
+
+
+def round_trip_pnl(closed_trades):
+    """
+    Profit of every closed trade, net of its closing fee
+    :param closed_trades: TradeLedger of ClosedTrade
+    :return: array, one per closed trade
+    """
+    n = len(closed_trades)
+    columns = closed_trades.columns
+    shares = columns['shares'][:n]
+    move = columns['exit'][:n] - columns['entry'][:n]
+    if 'short' in closed_trades.types:
+        short = closed_trades.type_[:n] == closed_trades.types.index('short')
+        move = np.where(short, -move, move)
+    return move * shares - np.nan_to_num(columns['fee'][:n])
+
+
+def _trade_rows(dates, trade_dates):
+    """Row of the bar each trade was made on"""
+    trade_dates = np.array(trade_dates, dtype='datetime64[ns]')
+    return np.searchsorted(dates, trade_dates, side='right') - 1
+
+
+def exposure(dates, account):
+    """
+    Fraction of bars valued with a position open. A position entered on a
+    bar is held from the next one, as the equity of a bar is taken before
+    its logic runs.
+    :param dates: dates of the bars, datetime64
+    :param account:
+    :return:
+    """
+    dates = np.asarray(dates).astype('datetime64[ns]')
+    n = len(dates)
+    opened, closed = account.opened_trades, account.closed_trades
+    held = np.zeros(n + 1)
+    np.add.at(held, _trade_rows(dates, opened.dates) + 1,
+              opened.columns['size'][:len(opened)])
+    np.add.at(held, _trade_rows(dates, closed.dates) + 1,
+              -closed.columns['shares'][:len(closed)])
+    held = np.cumsum(held[:n])
+    return np.mean(held > 10.0**-8) if n > 0 else np.nan
+
+
+def compute(result, account=None, periods=None, risk_free=0.0):
+    """
+    Metrics of a backtest
+
+    :param result: frame returned by a backtest's start methods
+    :param account: the backtest's account, for the trade figures
+    :param periods: bars per year, inferred from the dates by default
+    :param risk_free: return of cash per bar
+    :return: Metrics
+    """
+    equity = result['strategy_equity'].to_numpy(dtype=float)
+    benchmark = result['benchmark_equity'].to_numpy(dtype=float)
+    dates = result.index.to_numpy()
+    periods = periods_per_year(dates) if periods is None else periods
+    scale = np.sqrt(periods)
+
+    returns = result['strategy_return'].to_numpy(dtype=float)[1:] - risk_free
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = returns.mean() if len(returns) else np.nan
+        deviation = returns.std(ddof=1) if len(returns) > 1 else np.nan
+        downside = np.sqrt(np.mean(np.minimum(returns, 0.0)**2)) if len(returns) else np.nan
+
+        dd = drawdown(equity)
+        at_peak = np.flatnonzero(dd >= 0)
+        underwater = np.diff(np.append(at_peak, len(equity))) - 1
+
+        values = {
+            'total_return': equity[-1] / equity[0] - 1,
+            'benchmark_return': benchmark[-1] / benchmark[0] - 1,
+            'volatility': deviation * scale,
+            'sharpe': mean / deviation * scale,
+            'sortino': mean / downside * scale,
+            'max_drawdown': dd.min(),
+            'max_drawdown_duration': int(underwater.max()) if len(underwater) else 0,
+        }
+
+        values.update(dict.fromkeys(('exposure', 'turnover', 'win_rate', 'avg_win',
+                                     'avg_loss', 'profit_factor', 'pnl', 'fees'), np.nan))
+        values['round_trips'] = 0
+        if account is not None:
+            opened, closed = account.opened_trades, account.closed_trades
+            no, nc = len(opened), len(closed)
+            traded = np.sum(opened.columns['price'][:no] * opened.columns['size'][:no]) \
+                + np.sum(closed.columns['exit'][:nc] * closed.columns['shares'][:nc])
+            pnl = round_trip_pnl(closed)
+            wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+            values.update({
+                'exposure': exposure(dates, account),
+                'turnover': traded / equity.mean(),
+                'round_trips': nc,
+                'win_rate': len(wins) / nc if nc else np.nan,
+                'avg_win': wins.mean() if len(wins) else np.nan,
+                'avg_loss': losses.mean() if len(losses) else np.nan,
+                'profit_factor': wins.sum() / -losses.sum() if losses.sum() < 0 else np.nan,
+                'pnl': pnl.sum(),
+                'fees': np.nansum(opened.columns['fee'][:no]) + np.nansum(closed.columns['fee'][:nc]),
+            })
+    return Metrics(**values)
+
+
+def rolling_max_drawdown(equity, window):
+    """
+    Largest drawdown within each window of bars, exact, worked out a block
+    of windows at a time
+    :param equity:
+    :param window:
+    :return: array, NaN until the first full window
+    """
+    equity = np.asarray(equity, dtype=float)
+    out = np.full(len(equity), np.nan)
+    if len(equity) < window:
+        return out
+    windows = sliding_window_view(equity, window)
+    step = max(BLOCK_SIZE // window, 1)
+    for first in range(0, len(windows), step):
+        block = windows[first:first + step]
+        worst = (block / np.maximum.accumulate(block, axis=1) - 1).min(axis=1)
+        out[window - 1 + first:window - 1 + first + len(block)] = worst
+    return out
+
+
+def rolling(result, window, periods=None, risk_free=0.0):
+    """
+    Metrics over a moving window of bars
+
+    :param result: frame returned by a backtest's start methods
+    :param window: bars per window
+    :param periods: bars per year, inferred from the dates by default
+    :param risk_free: return of cash per bar
+    :return: dataframe of return, volatility, sharpe, sortino and
+        max_drawdown, indexed like result
+    """
+    periods = periods_per_year(result.index.to_numpy()) if periods is None else periods
+    scale = np.sqrt(periods)
+    equity = result['strategy_equity']
+    returns = result['strategy_return'] - risk_free
+
+    mean = returns.rolling(window).mean()
+    deviation = returns.rolling(window).std()
+    downside = np.sqrt((np.minimum(returns, 0.0)**2).rolling(window).mean())
+    df = pd.DataFrame({
+        'return': equity / equity.shift(window - 1) - 1,
+        'volatility': deviation * scale,
+        'sharpe': mean / deviation * scale,
+        'sortino': mean / downside * scale,
+        'max_drawdown': rolling_max_drawdown(equity.to_numpy(), window),
+    }, index=result.index)
+    return df
@@ -1,17 +1,17 @@
 import pandas as pd
 import numpy as np
-from talib.abstract import *
-import matplotlib.pyplot as plt
 import sys
 import breakout_lib as bl
 
 from momentum_algo import FixedWindowAlgo
 
 #local imports
-from gemini_modules import engine
+from gemini_modules import dataset, engine
+from gemini_modules.indicators import rolling
 
-#reads in crypto data
-df = pd.read_csv("data/USDT_BTC.csv",parse_dates=[0])
+#crypto data, read in by main() rather than on import
+DATASET = "data/USDT_BTC.csv"
+df = None
 
 #globals
 lookback_period = 48*2#*30
@@ -19,15 +19,12 @@ lookback_period = 48*2#*30
 buypoints = np.array([]) #for graphing only
 sellpoints = np.array([]) #for graphing only
 
-#backtesting
-backtest = engine.backtest(df)
-
 '''Algorithm function, lookback is a data frame parsed to function continuously until end of initial dataframe is reached.'''
 def logic(account, lookback):
     global buypoints,sellpoints
     try: 
-        lookback['Support'] = lookback['low'].rolling(window = lookback_period).min() #update PMA
-        lookback['Resistance'] = lookback['high'].rolling(window = lookback_period).mean() #update VMA
+        lookback['Support'] = rolling(lookback, 'low', lookback_period, 'min') #update PMA
+        lookback['Resistance'] = rolling(lookback, 'high', lookback_period, 'mean') #update VMA
                     
         today = len(lookback)-1 #latest data frame row index
 
@@ -49,7 +46,7 @@ def logic(account, lookback):
                     buypoints = np.append(buypoints,today) #for graphing only                    
     
         
-        if(len(lookback)==len(df)): #after running algorithm, graph it.
+        if(df is not None and len(lookback)==len(df)): #after running algorithm, graph it.
             base_plot_settings = {
                 "lines": {
                     "open":False,
@@ -86,6 +83,8 @@ Startindex is the index to start the graphing from and continues for 'size' unit
 plotPrice,plotBuySell,plotPMA,plotVolume,plotVMA are booleans to determine what is graphed.
 '''
 def plotAlgorithm(lookback: pd.DataFrame, startIndex:int, size:int, settings:dict):
+    import matplotlib.pyplot as plt
+
     _, ax1 = plt.subplots()
     ax1.set_xlabel("Time")
     
@@ -128,9 +127,18 @@ def plotAlgorithm(lookback: pd.DataFrame, startIndex:int, size:int, settings:dic
     plt.legend()
     plt.show() #graph it
 
-if __name__ == "__main__":
+def main(path=DATASET):
+    global df
+    df = dataset.load(path)
+
+    #backtesting
+    backtest = engine.backtest(df)
     backtest.start(100, logic=FixedWindowAlgo(
         lookback_tick_width=20, total_df_length=len(df), should_plot=True
         ).logic)
     backtest.results()
-    # backtest.chart(show_trades=True)
\ No newline at end of file
+    # backtest.chart(show_trades=True)
+    return backtest
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
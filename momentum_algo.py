@@ -1,16 +1,21 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from talib.abstract import *
 import numpy as np
-from gemini_modules import engine
+from gemini_modules import dataset, engine, helpers
+from gemini_modules.indicators import RollingMax, RollingMin, rolling
+from gemini_modules.lookback import Lookback, timeframe_bins
 
 
 class BaseAlgo:
     """A foundation algorithm class that is used to initialise:
     - Buy points
     - Sell points
+    - Streaming indicators, updated once per new bar
     - Plotting of support, resistance, buypoints etc.
+
+    max_lookback is the number of recent bars the logic reads, None when it
+    needs the whole history. Streaming backtests only keep that many.
     """
+    max_lookback = None
 
     def __init__(self, total_df_length: int, should_plot: bool, plotting_options=None):
         self.total_df_length = total_df_length
@@ -20,6 +25,10 @@ class BaseAlgo:
         self.buypoints = []
         self.sellpoints = []
 
+        # Streaming indicators by name, fed by update_indicators
+        self.indicators = {}
+        self.bars_seen = 0
+
         self.default_plotting_options = {
                 "lines": {
                     "open": False,
@@ -43,83 +52,127 @@ class BaseAlgo:
 
             self.plotting_options = plotting_options
 
+    def update_indicators(self, lookback, stop=None):
+        """Feeds the bars of the lookback that haven't been seen yet, up to
+        (not including) stop, into the streaming indicators."""
+        stop = len(lookback) if stop is None else stop
+        if stop < self.bars_seen:
+            # A new run has started
+            self.reset_indicators()
+
+        if stop > self.bars_seen:
+            start = lookback.start if isinstance(lookback, Lookback) else 0
+            if self.bars_seen < start:
+                raise ValueError("Bars were dropped from the lookback before "
+                                 "the indicators saw them")
+            for indicator in self.indicators.values():
+                if isinstance(lookback, Lookback):
+                    values = lookback.values(indicator.column)
+                else:
+                    values = lookback[indicator.column].to_numpy()
+                for value in values[self.bars_seen - start:stop - start]:
+                    indicator.update(value)
+            self.bars_seen = stop
+        return
+
+    def reset_indicators(self):
+        """Clears the streaming indicators ready for a new run."""
+        for indicator in self.indicators.values():
+            indicator.reset()
+        self.bars_seen = 0
+        return
+
     def calc_support_df(self, lookback):
         """Base algo doesnt have an associated support,
         so just returns nan array"""
-        return np.full_like(lookback, np.nan)
+        return np.full(len(lookback), np.nan)
     
     def calc_resistance_df(self, lookback):
         """Base algo doesnt have an associated resistance,
         so just returns nan array"""
-        return np.full_like(lookback, np.nan)
+        return np.full(len(lookback), np.nan)
 
 
-    def plot(self, lookback: pd.DataFrame):
-        _, ax1 = plt.subplots()
-        ax1.set_xlabel("Time")
+    def draw(self, ax, lookback: pd.DataFrame, max_points=None):
+        """Draws the prices, support, resistance and trades of the lookback
+        on a matplotlib axes, without changing the lookback.
+        :param max_points: decimate each line to about this many points,
+            keeping the highs and lows, None draws every bar
+        """
+        ax.set_xlabel("Time")
 
         start_index, stop_index = self.plotting_options["tick-interval"]
-        buypoints_array = np.array(self.buypoints)
-        sellpoints_array = np.array(self.sellpoints)
-
-        lookback['Resistance'] = self.calc_resistance_df(lookback)
-        lookback['Support'] = self.calc_support_df(lookback)
-
-        if self.plotting_options["lines"]["open"]:
-            # trim close prices
-            prices = lookback["open"].iloc[start_index:stop_index]
-            prices.plot(label="Open Price")
-            ax1.set_ylabel("Price (USDT)")
-
-        if self.plotting_options["lines"]["close"]:
-            # trim close prices
-            prices = lookback["close"].iloc[start_index:stop_index]
-            prices.plot(label="Close Price", color="black")
-            ax1.set_ylabel("Price (USDT)")
-
-        if self.plotting_options["lines"]["low"]:
-            # trim close prices
-            prices = lookback["low"].iloc[start_index:stop_index]
-            prices.plot(label="Low Price")
-
-        if self.plotting_options["lines"]["high"]:
-            # trim close prices
-            prices = lookback["high"].iloc[start_index:stop_index]
-            prices.plot(label="High Price")
-
-        if self.plotting_options["lines"]["resistance"]:
-            # trim close prices
-            prices = lookback["Resistance"].iloc[start_index:stop_index]
-            prices.plot(label="Resistance Price")
-
-        if self.plotting_options["lines"]["support"]:
-            # trim close prices
-            prices = lookback["Support"].iloc[start_index:stop_index]
-            prices.plot(label="Support Price")
+        buypoints_array = np.array(self.buypoints, dtype=int)
+        sellpoints_array = np.array(self.sellpoints, dtype=int)
+
+        index = np.asarray(lookback.index)[start_index:stop_index]
+        lines = {
+            "open": ("Open Price", None),
+            "close": ("Close Price", "black"),
+            "low": ("Low Price", None),
+            "high": ("High Price", None),
+            "resistance": ("Resistance Price", None),
+            "support": ("Support Price", None),
+        }
+        for line, (label, color) in lines.items():
+            if not self.plotting_options["lines"][line]:
+                continue
+            if line == "resistance":
+                prices = self.calc_resistance_df(lookback)
+            elif line == "support":
+                prices = self.calc_support_df(lookback)
+            else:
+                prices = lookback[line]
+                ax.set_ylabel("Price (USDT)")
+            # trim prices
+            prices = np.asarray(prices, dtype=float)[start_index:stop_index]
+            rows = np.arange(len(prices)) if max_points is None else \
+                helpers.minmax(prices, max(max_points // 4, 1))
+            ax.plot(index[rows], prices[rows], label=label, color=color)
 
         # Plotting points
+        close = lookback["close"]
         if self.plotting_options["points"]["buy"]:
             in_range_mask = (start_index <= buypoints_array) & (buypoints_array<= stop_index)
             buy = buypoints_array[in_range_mask]  # trim buy points
-
-            plt.scatter(buy, lookback["close"][buy], color="red", label="Buy Point")
+            ax.scatter(buy, close[buy], color="red", label="Buy Point")
 
         if self.plotting_options["points"]["sell"]:
             in_range_mask = (start_index <= sellpoints_array) & (sellpoints_array<= stop_index)
             sell = sellpoints_array[in_range_mask]  # trim sell points
-            plt.scatter(
-                sell, lookback["close"][sell], color="green", label="Sell Point"
-            )
+            ax.scatter(sell, close[sell], color="green", label="Sell Point")
+
+        ax.legend()
+        return
+
+    def plot(self, lookback: pd.DataFrame):
+        import matplotlib.pyplot as plt  # slow to import, so only when plotting
 
-        plt.legend()
+        _, ax1 = plt.subplots()
+        self.draw(ax1, lookback)
         plt.show()  # graph it
         return
 
+    def render(self, lookback: pd.DataFrame, filename: str, max_points=4000,
+               figsize=(16, 8), dpi=100):
+        """Writes the chart of plot to an image file, without a display and
+        without touching pyplot, so it is safe in worker processes."""
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=figsize)
+        self.draw(figure.subplots(), lookback, max_points)
+        figure.savefig(filename, dpi=dpi)
+        return filename
+
 
 class FixedWindowAlgo(BaseAlgo):
     """This algorithm will use a fixed window of specified length in order to calculate support and resistance.
     :param lookback_tick_width: how many ticks back to calculate support and resistance.
     :total_df_length: length of the total dataframe
+    :param symbol: asset traded when backtesting a portfolio
+    :param timeframe: frequency of the bars support and resistance are taken
+        over, e.g. '4h', instead of the bars traded on. The window is then in
+        completed bars of that timeframe.
     """
 
     def __init__(
@@ -128,10 +181,20 @@ class FixedWindowAlgo(BaseAlgo):
         total_df_length: int,
         should_plot: bool,
         plotting_options=None,
+        symbol=None,
+        timeframe=None,
     ):
         self.lookback_period = lookback_tick_width
+        self.symbol = symbol
+        self.timeframe = timeframe
+        # The window before the current bar, and the current bar. Timeframe
+        # bars are aggregated as each bar arrives, so only that one is needed
+        self.max_lookback = lookback_tick_width + 1 if timeframe is None else 1
 
         super().__init__(total_df_length, should_plot, plotting_options)
+
+        self.indicators["support"] = RollingMin("low", lookback_tick_width)
+        self.indicators["resistance"] = RollingMax("high", lookback_tick_width)
         return
 
     def logic(self, account: engine.exchange.Account, lookback: pd.DataFrame):
@@ -139,12 +202,19 @@ class FixedWindowAlgo(BaseAlgo):
         # Just started. Skip iteration
         current_index = len(lookback) - 1
 
+        # Support and resistance are taken over the bars before this one
+        if self.timeframe is None:
+            self.update_indicators(lookback, stop=current_index)
+        else:
+            bars = lookback.timeframe(self.timeframe)
+            self.update_indicators(bars, stop=len(bars) - 1)
+
         if current_index == 0:
             return
 
         current_price = lookback["close"][current_index]
-        support = self.calc_support_df(lookback)[current_index - 1]
-        resistance = self.calc_resistance_df(lookback)[current_index - 1]
+        support = self.indicators["support"].value
+        resistance = self.indicators["resistance"].value
 
 
         if resistance < current_price:
@@ -164,37 +234,83 @@ class FixedWindowAlgo(BaseAlgo):
 
         return
 
+    def signals(self, df: pd.DataFrame) -> dict:
+        """Function to be passed to the vectorized backtesting module.
+        Breakouts are measured against the previous bar's support and resistance."""
+        close = df["close"]
+        if self.timeframe is None:
+            entry = (self.calc_resistance_df(df).shift(1) < close).to_numpy()
+            exit = (self.calc_support_df(df).shift(1) > close).to_numpy()
+        else:
+            # Already taken over the completed timeframe bars
+            entry = (self.calc_resistance_df(df) < close).to_numpy()
+            exit = (self.calc_support_df(df) > close).to_numpy()
+
+        self.buypoints = np.flatnonzero(entry).tolist()
+        self.sellpoints = np.flatnonzero(exit).tolist()
+
+        if self.should_plot:
+            self.plot(lookback=df)
+
+        return {"entry": entry, "exit": exit}
+
     def calc_support_df(self, lookback: pd.DataFrame) -> float:
-        """Calculates the support df and returns it"""
+        """Calculates the support df and returns it. With a timeframe, the
+        support in force on each bar, over the completed timeframe bars."""
+        if self.timeframe is not None:
+            return self._timeframe_level(lookback, "low", np.fmin)
 
-        support_df = lookback["low"].rolling(window=self.lookback_period).min()
-        return support_df
+        support = rolling(lookback, "low", self.lookback_period, "min")
+        return pd.Series(support, index=lookback.index)
 
     def calc_resistance_df(self, lookback: pd.DataFrame) -> float:
-        """Calculates the resistance df and returns it"""
-
-        support_df = lookback["high"].rolling(window=self.lookback_period).max()
-        return support_df
+        """Calculates the resistance df and returns it. With a timeframe, the
+        resistance in force on each bar, over the completed timeframe bars."""
+        if self.timeframe is not None:
+            return self._timeframe_level(lookback, "high", np.fmax)
+
+        resistance = rolling(lookback, "high", self.lookback_period, "max")
+        return pd.Series(resistance, index=lookback.index)
+
+    def _timeframe_level(self, lookback: pd.DataFrame, column: str, ufunc) -> pd.Series:
+        """Rolling extremum of the completed timeframe bars, mapped back
+        onto the bars of the lookback"""
+        bins = timeframe_bins(np.asarray(lookback["date"]), self.timeframe)
+        new_bar = np.ones(len(bins), dtype=bool)
+        new_bar[1:] = bins[1:] != bins[:-1]
+        starts = np.flatnonzero(new_bar)
+        bars = pd.Series(ufunc.reduceat(np.asarray(lookback[column], dtype=float), starts))
+
+        window = bars.rolling(self.lookback_period)
+        level = (window.min() if ufunc is np.fmin else window.max()).to_numpy()
+        # The bar a row falls in is still forming, so the level is the one
+        # reached at the end of the previous bar
+        level = np.concatenate(([np.nan], level[:-1]))
+        return pd.Series(level[np.cumsum(new_bar) - 1], index=lookback.index)
 
     def enter_long(self, account: engine.exchange.Account, current_price: float):
-        """Enters a long position with the whole portfolio."""
-        if account.buying_power > 0:
+        """Enters a long position with the whole portfolio, unless one is
+        already open. The buying power left then is only rounding dust, and
+        the vectorized signals hold a single position too."""
+        held = any(p.symbol == self.symbol for p in account.positions)
+        if account.buying_power > 0 and not held:
             # use 100% of portfolio to buy
             account.enter_position(
-                "long", entry_capital=account.buying_power, entry_price=current_price
+                "long", entry_capital=account.buying_power, entry_price=current_price,
+                symbol=self.symbol,
             )
         return
 
     def close_long(self, account: engine.exchange.Account, current_price: float):
         """Closing all positions in the portfolio."""
         for position in account.positions:
-            if position.type_ == "long":
+            if position.type_ == "long" and position.symbol == self.symbol:
                 # use 100% of portfolio to sell
                 account.close_position(position, 1, current_price)
         return
 
 if __name__=="__main__":
-    df = pd.read_csv("data/USDT_XRP.csv",parse_dates=[0])
+    df = dataset.load("data/USDT_XRP.csv")
     backtest = engine.backtest(df)
     backtest.start(100, logic=FixedWindowAlgo(
         lookback_tick_width=145, total_df_length=len(df), should_plot=True
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+
+# local imports
+from gemini_modules import live
+from momentum_algo import FixedWindowAlgo
+
+
+async def replay(symbols, width, initial_capital, speed):
+    """Paper trade FixedWindowAlgo on every symbol, fed by a local replay server."""
+    server = await live.replay_server(speed=speed)
+    port = server.sockets[0].getsockname()[1]
+    trader = live.paper_trader()
+    for symbol in symbols:
+        algo = FixedWindowAlgo(width, 0, False, symbol=symbol)
+        trader.add(symbol, live.replay_feed(symbol, port=port), algo.logic,
+                   initial_capital)
+    try:
+        await trader.run()
+    finally:
+        server.close()
+        await server.wait_closed()
+    return trader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paper trade over replayed data/USDT_*.csv feeds")
+    parser.add_argument("symbols", nargs="*", default=["BTC", "ETH", "XRP"])
+    parser.add_argument("--width", type=int, default=145, help="lookback tick width")
+    parser.add_argument("--capital", type=float, default=100)
+    parser.add_argument("--speed", type=float, default=None,
+                        help="bars per second per symbol, as fast as possible by default")
+    args = parser.parse_args()
+
+    trader = asyncio.run(replay(args.symbols, args.width, args.capital, args.speed))
+    trader.results()
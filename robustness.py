@@ -0,0 +1,153 @@
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+# local imports
+from gemini_modules import dataset, engine, exchange, metrics
+from sweep import asset_name, init_worker, load_dataset
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+def bootstrap_paths(df: pd.DataFrame, n_paths: int, block: int = 48,
+                    rng=None) -> dict:
+    """Price paths resampled from a dataset by a circular block bootstrap.
+
+    Each bar is described by its close to close return and by its open,
+    high and low relative to its own close. Blocks of consecutive bars are
+    drawn with replacement and chained from the first close, so paths keep
+    the short range structure of the data and every bar stays consistent.
+
+    :return: dict of (n_paths, bars) arrays by column, the dates are shared
+        with the dataset
+    """
+    rng = np.random.default_rng(rng)
+    close = df["close"].to_numpy(dtype=float)
+    moves = close[1:] / close[:-1]
+    shape = {column: df[column].to_numpy(dtype=float)[1:] / close[1:]
+             for column in ("open", "high", "low")}
+    volume = df["volume"].to_numpy(dtype=float)[1:]
+
+    n = len(moves)
+    starts = rng.integers(0, n, size=(n_paths, -(-n // block)))
+    rows = ((starts[:, :, None] + np.arange(block)) % n).reshape(n_paths, -1)[:, :n]
+
+    paths = {"close": np.empty((n_paths, n + 1))}
+    paths["close"][:, 0] = close[0]
+    np.cumprod(moves[rows], axis=1, out=paths["close"][:, 1:])
+    paths["close"][:, 1:] *= close[0]
+    for column, ratio in shape.items():
+        paths[column] = np.empty((n_paths, n + 1))
+        paths[column][:, 0] = df[column].iloc[0]
+        np.multiply(ratio[rows], paths["close"][:, 1:], out=paths[column][:, 1:])
+    paths["volume"] = np.empty((n_paths, n + 1))
+    paths["volume"][:, 0] = df["volume"].iloc[0]
+    paths["volume"][:, 1:] = volume[rows]
+    return paths
+
+
+def fee_draws(n_paths: int, fees=None, noise: float = 0.0, rng=None) -> list:
+    """Fee rates for each path, the base rates scaled by lognormal noise.
+
+    :param fees: base rate by position type, defaults to the account's
+        default, settings.FEES when it is set
+    :param noise: standard deviation of the log of the scale, needs base rates
+    """
+    rng = np.random.default_rng(rng)
+    fees = exchange.FEES if fees is None else fees
+    if noise > 0 and len(fees) == 0:
+        raise ValueError("Error: Fee noise needs base fee rates, pass fees or set settings.FEES")
+    scales = np.exp(rng.normal(0, noise, size=(n_paths, len(fees)))) \
+        if noise > 0 else np.ones((n_paths, len(fees)))
+    return [{type_: rate * scale for (type_, rate), scale in zip(fees.items(), row)}
+            for row in scales]
+
+
+def run_batch(algo_class, params: dict, path: str, seed, n_paths: int,
+              first: int = 0, block: int = 48, fees=None, fee_noise: float = 0.0,
+              initial_capital: float = 100) -> list:
+    """Generates a batch of paths and backtests the strategy on each of them
+    with its vectorized signals."""
+    df = load_dataset(path)
+    rng = np.random.default_rng(seed)
+    paths = bootstrap_paths(df, n_paths, block, rng)
+    draws = fee_draws(n_paths, fees, fee_noise, rng)
+
+    rows = []
+    for i in range(n_paths):
+        data = pd.DataFrame({"date": df["date"].to_numpy()})
+        for column, values in paths.items():
+            data[column] = values[i]
+        algo = algo_class(total_df_length=len(data), should_plot=False, **params)
+        result = engine.backtest(data).start_vectorized(
+            initial_capital, algo.signals, fee=draws[i])
+        equity = result["strategy_equity"].to_numpy()
+        rows.append({
+            "path": first + i,
+            "final_equity": equity[-1],
+            "max_drawdown": metrics.drawdown(equity).min(),
+            "benchmark_return": paths["close"][i, -1] / paths["close"][i, 0] - 1,
+            **{"fee_" + type_: rate for type_, rate in draws[i].items()},
+        })
+    return rows
+
+
+def monte_carlo(algo_class, params: dict, path: str, n_paths: int = 1000,
+                block: int = 48, fees=None, fee_noise: float = 0.0,
+                initial_capital: float = 100, batch_size: int = 50, seed=0,
+                max_workers=None) -> pd.DataFrame:
+    """Backtests a strategy on n_paths bootstrapped versions of a dataset.
+
+    Paths are generated and run in batches on a process pool, each batch
+    from its own child of the seed, so the result only depends on the seed
+    and batch_size.
+
+    :param block: bars per bootstrap block, a day of 30 minute bars by default
+    :param fees: base fee rate by position type, defaults to settings.FEES
+        when it is set
+    :param fee_noise: lognormal noise applied to the fees of each path
+    :return: one row per path with its final equity and max drawdown
+    """
+    fee_draws(0, fees, fee_noise)  # check the fees before starting the pool
+    dataset.ensure(path)  # and build the cache, so the workers only read it
+    batches = [(first, min(batch_size, n_paths - first))
+               for first in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker) as pool:
+        futures = [
+            pool.submit(run_batch, algo_class, params, path, child, size,
+                        first, block, fees, fee_noise, initial_capital)
+            for (first, size), child in zip(batches, seeds)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            rows.extend(future.result())
+
+    df = pd.DataFrame(rows).sort_values("path").reset_index(drop=True)
+    df.attrs["asset"] = asset_name(path)
+    return df
+
+
+def distribution(results: pd.DataFrame, quantiles=QUANTILES) -> pd.DataFrame:
+    """Mean and quantiles of the final equity and max drawdown over paths."""
+    columns = ["final_equity", "max_drawdown", "benchmark_return"]
+    summary = results[columns].quantile(quantiles)
+    summary.index = ["q{0:g}".format(q * 100) for q in quantiles]
+    summary.loc["mean"] = results[columns].mean()
+    summary.loc["std"] = results[columns].std()
+    return summary
+
+
+if __name__ == "__main__":
+    import time
+    from momentum_algo import FixedWindowAlgo
+
+    started = time.perf_counter()
+    results = monte_carlo(FixedWindowAlgo, {"lookback_tick_width": 145},
+                          "data/USDT_XRP.csv", n_paths=1000,
+                          fees={"long": 0.001, "short": 0.001}, fee_noise=0.25)
+    print(distribution(results))
+    print("{0} paths in {1:.1f}s".format(len(results), time.perf_counter() - started))
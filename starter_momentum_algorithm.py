@@ -1,25 +1,22 @@
 import pandas as pd
-from talib.abstract import *
 
 # local imports
-from gemini_modules import engine
+from gemini_modules import dataset, engine
+from gemini_modules.indicators import rolling
 
-# read in data preserving dates
-df = pd.read_csv("data/USDT_LTC.csv", parse_dates=[0])
+# data, read in by main() rather than on import
+DATASET = "data/USDT_LTC.csv"
 
 # globals
 training_period = 20
 
-#backtesting
-backtest = engine.backtest(df)
-
 '''Algorithm function, lookback is a data frame parsed to function continuously until end of initial dataframe is reached.'''
 def logic(account, lookback):
     try:
         today = len(lookback)-1
         if(today > training_period): 
-            price_moving_average = lookback['close'].rolling(window=training_period).mean()[today]  # update PMA
-            volumn_moving_average = lookback['volume'].rolling(window=training_period).mean()[today]  # update VMA
+            price_moving_average = rolling(lookback, 'close', training_period, 'mean')[today]  # update PMA
+            volumn_moving_average = rolling(lookback, 'volume', training_period, 'mean')[today]  # update VMA
 
             if(lookback['close'][today] < price_moving_average):
                 if(lookback['volume'][today] > volumn_moving_average):
@@ -35,7 +32,16 @@ def logic(account, lookback):
     pass  # Handles lookback errors in beginning of dataset
 
 
-if __name__ == "__main__":
+def main(path=DATASET):
+    # read in data preserving dates
+    df = dataset.load(path)
+
+    #backtesting
+    backtest = engine.backtest(df)
     backtest.start(100, logic)
     backtest.results()
     # backtest.chart(show_trades=True)
+    return backtest
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,20 @@
 import pandas as pd
 import numpy as np
-from talib.abstract import *
-import matplotlib.pyplot as plt
 import sys
 
 #local imports
-from gemini_modules import engine
+from gemini_modules import dataset, engine
+from gemini_modules.indicators import rolling
 
-#reads in crypto data
-df = pd.read_csv("data/USDT_BTC.csv",parse_dates=[0])
+#crypto data, read in by main() rather than on import
+DATASET = "data/USDT_BTC.csv"
+df = None
 
 #globals
 training_period = 10
 buypoints = np.array([]) #for graphing only
 sellpoints = np.array([]) #for graphing only
 
-#backtesting
-backtest = engine.backtest(df)
-
 
 '''Algorithm function, lookback is a data frame parsed to function continuously until end of initial dataframe is reached.'''
 def logic(account, lookback):
@@ -25,8 +22,8 @@ def logic(account, lookback):
     try:
         if(len(lookback['close']) > training_period): #if finished training
             
-            lookback['Price Moving Average'] = lookback['close'].rolling(window = training_period).mean() #update PMA
-            lookback['Volumn Moving Average'] = lookback['volume'].rolling(window = training_period).mean() #update VMA
+            lookback['Price Moving Average'] = rolling(lookback, 'close', training_period, 'mean') #update PMA
+            lookback['Volumn Moving Average'] = rolling(lookback, 'volume', training_period, 'mean') #update VMA
             lookback['Price Lower Than MAVG'] = lookback['Price Moving Average'].gt(lookback['close']) #update boolean
             lookback['Volumn Higher Than MAVG'] = lookback['volume'].gt(lookback['Volumn Moving Average']) #update boolean
             
@@ -47,7 +44,7 @@ def logic(account, lookback):
                                 sellpoints = np.append(sellpoints,today) #for graphing only
         
         
-        if(len(lookback)==len(df)): #after running algorithm, graph it.
+        if(df is not None and len(lookback)==len(df)): #after running algorithm, graph it.
             plotAlgorithm(lookback,200,50,True,True,True,True,True)
  
     except Exception as e:
@@ -64,6 +61,8 @@ Startindex is the index to start the graphing from and continues for 'size' unit
 plotPrice,plotBuySell,plotPMA,plotVolume,plotVMA are booleans to determine what is graphed.
 '''
 def plotAlgorithm(lookback,startIndex,size,plotPrice,plotBuySell,plotPMA,plotVolume,plotVMA):
+    import matplotlib.pyplot as plt
+
     _, ax1 = plt.subplots()
     ax1.set_xlabel("Time")
     
@@ -106,7 +105,16 @@ def plotAlgorithm(lookback,startIndex,size,plotPrice,plotBuySell,plotPMA,plotVol
 
     plt.show() #graph it
 
-if __name__ == "__main__":
+def main(path=DATASET):
+    global df
+    df = dataset.load(path)
+
+    #backtesting
+    backtest = engine.backtest(df)
     backtest.start(100, logic)
     backtest.results()
-    backtest.chart()
\ No newline at end of file
+    backtest.chart()
+    return backtest
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
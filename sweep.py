@@ -0,0 +1,153 @@
+import concurrent.futures
+import itertools
+import os
+
+import pandas as pd
+
+# local imports
+from gemini_modules import dataset, engine, helpers, metrics
+
+DEFAULT_ASSETS = [
+    "data/USDT_BTC.csv",
+    "data/USDT_DOGE.csv",
+    "data/USDT_ETH.csv",
+    "data/USDT_LTC.csv",
+    "data/USDT_XRP.csv",
+]
+
+# Datasets already read by this worker process, by path
+_loaded = {}
+
+
+def init_worker():
+    """Workers never draw anything, so keep matplotlib off the display."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def load_dataset(path: str) -> pd.DataFrame:
+    """Reads a dataset once per process."""
+    if path not in _loaded:
+        _loaded[path] = dataset.load(path)
+    return _loaded[path]
+
+
+def asset_name(path: str) -> str:
+    """data/USDT_BTC.csv -> USDT_BTC"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def chart_name(path: str, params: dict) -> str:
+    """USDT_BTC, {"lookback_tick_width": 145} -> USDT_BTC_lookback_tick_width=145.png"""
+    labels = ["{0}={1}".format(name, value) for name, value in params.items()]
+    return "_".join([asset_name(path)] + labels) + ".png"
+
+
+def run_one(algo_class, params: dict, path: str, initial_capital: float = 100,
+            vectorized: bool = False, chart_dir=None) -> dict:
+    """Backtests one parameter combination on one asset and summarises it,
+    with the numbers of results() and the metrics of the run.
+    With a chart_dir the strategy's chart is rendered there too, from the
+    trades and cached indicators of this run."""
+    df = load_dataset(path)
+    algo = algo_class(total_df_length=len(df), should_plot=False, **params)
+
+    backtest = engine.backtest(df)
+    if vectorized:
+        result = backtest.start_vectorized(initial_capital, algo.signals)
+    else:
+        result = backtest.start(initial_capital, algo.logic)
+    row = summarise(backtest, asset=asset_name(path), **params)
+    row.update(metrics.compute(result, backtest.account).to_dict())
+    if chart_dir is not None:
+        row["chart"] = algo.render(df, os.path.join(chart_dir, chart_name(path, params)))
+    return row
+
+
+def summarise(backtest: engine.backtest, **labels) -> dict:
+    """The numbers printed by backtest.results, as a row."""
+    account = backtest.account
+    final_price = backtest.data.iloc[-1]["close"]
+    final_equity = account.total_value(final_price)
+
+    row = dict(labels)
+    row["final_equity"] = final_equity
+    row["benchmark_return"] = helpers.percent_change(
+        backtest.data.iloc[0]["open"], final_price)
+    row["strategy_return"] = helpers.percent_change(
+        account.initial_capital, final_equity)
+    row["longs"] = account.opened_trades.count("long")
+    row["sells"] = account.closed_trades.count("long")
+    row["shorts"] = account.opened_trades.count("short")
+    row["covers"] = account.closed_trades.count("short")
+    row["trades"] = row["longs"] + row["sells"] + row["shorts"] + row["covers"]
+    return row
+
+
+def iter_sweep(algo_class, assets=None, initial_capital: float = 100,
+               vectorized: bool = False, max_workers=None, chart_dir=None,
+               **param_ranges):
+    """Runs every parameter x asset combination on a process pool.
+
+    :param algo_class: Strategy class, e.g. FixedWindowAlgo
+    :param assets: Paths of the datasets, defaults to all of data/
+    :param chart_dir: Folder to render the chart of every run into, by the
+        worker that ran it
+    :param param_ranges: Iterable of values for each strategy parameter,
+        e.g. lookback_tick_width=range(10, 500, 5)
+
+    Yields one result row per run as soon as it finishes, so the order is
+    not the order of submission.
+    """
+    assets = DEFAULT_ASSETS if assets is None else list(assets)
+    names = list(param_ranges)
+    combinations = [dict(zip(names, values))
+                    for values in itertools.product(*param_ranges.values())]
+
+    if chart_dir is not None:
+        os.makedirs(chart_dir, exist_ok=True)
+
+    # Build the binary caches here, so the workers only ever read them
+    for path in assets:
+        dataset.ensure(path)
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker) as pool:
+        # Workers keep the datasets they have read, see load_dataset
+        futures = [
+            pool.submit(run_one, algo_class, params, path, initial_capital,
+                        vectorized, chart_dir)
+            for path in assets for params in combinations
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def sweep(algo_class, assets=None, initial_capital: float = 100,
+          vectorized: bool = False, max_workers=None, callback=None,
+          chart_dir=None, **param_ranges) -> pd.DataFrame:
+    """Same as iter_sweep, but collects the rows into one dataframe.
+
+    :param callback: Called with each row as it arrives
+    """
+    rows = []
+    for row in iter_sweep(algo_class, assets, initial_capital, vectorized,
+                          max_workers, chart_dir, **param_ranges):
+        if callback is not None:
+            callback(row)
+        rows.append(row)
+
+    names = ["asset"] + list(param_ranges)
+    return pd.DataFrame(rows).sort_values(names).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from momentum_algo import FixedWindowAlgo
+
+    results = sweep(
+        FixedWindowAlgo,
+        lookback_tick_width=range(10, 500, 5),
+        callback=lambda row: print(
+            "{asset} {lookback_tick_width}: {strategy_return:.2%}".format(**row)),
+    )
+    print(results.sort_values("final_equity", ascending=False).head(20))
@@ -0,0 +1,52 @@
+from unittest import TestCase
+import io, json
+import os, sys, shutil, tempfile
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import batch, cli
+
+data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+class test_batch(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.small = os.path.join(self.folder, "small.csv")
+        pd.read_csv(os.path.join(data, "USDT_LTC.csv"))[:300].to_csv(self.small, index=False)
+        self.config = os.path.join(self.folder, "config.json")
+        with open(self.config, "w") as f:
+            json.dump({
+                "defaults": {"vectorized": True},
+                "jobs": [
+                    {"strategy": "fixed_window", "dataset": "ETH", "params": {"lookback_tick_width": 145}},
+                    {"strategy": "starter", "dataset": self.small, "params": {"training_period": 5},
+                     "vectorized": False, "initial_capital": 50},
+                    {"strategy": "fixed_window", "dataset": "ETH", "params": {"lookback_tick_width": 50}},
+                    {"strategy": "starter", "dataset": self.small},
+                ]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_grouped(self):
+        log = io.StringIO()
+        module = cli.strategy_module("starter")
+        training_period = module.training_period
+        results = batch.run_jobs(batch.load_config(self.config), log=log)
+
+        self.assertEqual(list(results["job"]), [0, 1, 2, 3])
+        self.assertEqual(log.getvalue().count("loaded"), 2)
+        self.assertEqual(results["error"].isna().tolist(), [True, True, True, False])
+        self.assertEqual(results.loc[1, "initial_capital"], 50)
+        self.assertNotEqual(results.loc[0, "final_equity"], results.loc[2, "final_equity"])
+        self.assertEqual(module.training_period, training_period)
+
+        output = batch.write_results(results, os.path.join(self.folder, "results.json"))
+        with open(output) as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+    def test_invalid(self):
+        with open(self.config, "w") as f:
+            json.dump([{"strategy": "fixed_window", "dataset": "ETH", "width": 3}], f)
+        self.assertRaises(ValueError, batch.load_config, self.config)
@@ -1,4 +1,5 @@
 from unittest import TestCase
+import numpy as np
 import pandas as pd
 
 import os, sys
@@ -30,3 +31,37 @@ class test_calcs(TestCase):
         self.assertEqual(bl.return_resistance(df,4), 10)
         self.assertEqual(bl.return_resistance(df,3), 10)
 
+
+class test_series(TestCase):
+    def test_matches_rolling(self):
+        rng = np.random.default_rng(0)
+        close = 10 * np.exp(rng.normal(0, 0.01, 200).cumsum())
+        history = pd.DataFrame({'low': close * 0.99, 'high': close * 1.01})
+        for ticks in [1, 3, 16, 250]:
+            np.testing.assert_array_equal(bl.support_series(history, ticks),
+                                          history['low'].rolling(ticks, min_periods=1).min())
+            np.testing.assert_array_equal(bl.resistance_series(history, ticks),
+                                          history['high'].rolling(ticks, min_periods=1).max())
+            for i in [0, ticks - 1, len(history) - 1]:
+                self.assertEqual(bl.return_support(history[:i+1], ticks), min(history['low'][:i+1][-ticks:]))
+                self.assertEqual(bl.return_resistance(history[:i+1], ticks), max(history['high'][:i+1][-ticks:]))
+
+    def test_nan(self):
+        lows = np.array([3, 1, np.nan, 2, 5, 4, 6])
+        expected = pd.Series(lows).rolling(3, min_periods=1).min()
+        expected[pd.Series(np.isnan(lows)).rolling(3, min_periods=1).max() > 0] = np.nan
+        np.testing.assert_array_equal(bl.support_series({'low': lows}, 3), expected)
+
+    def test_scalar_type(self):
+        self.assertIsInstance(bl.return_support(df, 5), np.int64)
+        self.assertIsInstance(bl.return_resistance(df.astype(float), 5), np.float64)
+
+    def test_matrix(self):
+        widths = [1, 3, 4, 10, 12]
+        support = bl.support_matrix(df, widths)
+        resistance = bl.resistance_matrix(df, widths)
+        self.assertEqual(support.shape, (len(widths), len(df)))
+        for row, ticks in enumerate(widths):
+            np.testing.assert_array_equal(support[row], bl.support_series(df, ticks))
+            np.testing.assert_array_equal(resistance[row], df['high'])
+        self.assertRaises(ValueError, bl.support_series, df, 0)
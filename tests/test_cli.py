@@ -0,0 +1,63 @@
+from unittest import TestCase
+import contextlib
+import io
+import json
+import subprocess
+
+import os, sys, tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import cli
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(*argv):
+    return subprocess.run([sys.executable] + list(argv), cwd=root, check=True,
+                          capture_output=True, text=True)
+
+class test_cli(TestCase):
+    def test_import_is_light(self):
+        # Importing the strategies reads nothing and leaves plotting and TA-Lib out
+        code = ("import sys, builtins\n"
+                "opened = []\n"
+                "real_open = builtins.open\n"
+                "builtins.open = lambda f, *a, **k: opened.append(f) or real_open(f, *a, **k)\n"
+                "import momentum_algo, main, starter_momentum_algorithm, starter_momentum_algorithm_graphing\n"
+                "print([m for m in ('bokeh', 'talib', 'matplotlib') if m in sys.modules])\n"
+                "print([f for f in opened if str(f).endswith(('.csv', '.npy', '.json'))])\n")
+        self.assertEqual(run("-c", code).stdout.split("\n")[:2], ["[]", "[]"])
+
+    def test_json(self):
+        output = run("-m", "gemini_modules", "fixed_window", "ETH", "--param", "lookback_tick_width=145",
+                     "--end", "2020-02-01", "--vectorized", "--json", "--timing")
+        row = json.loads(output.stdout)
+        self.assertEqual(row["lookback_tick_width"], 145)
+        self.assertEqual(row["bars"], 31*48 + 1)
+        self.assertIn("sharpe", row)
+        self.assertIn("total", output.stderr)
+
+    def test_arguments(self):
+        self.assertEqual(cli.parse_param("training_period=20"), ("training_period", 20))
+        self.assertEqual(cli.parse_param("timeframe=4h"), ("timeframe", "4h"))
+        self.assertTrue(cli.dataset_path("xrp").endswith(os.path.join("data", "USDT_XRP.csv")))
+        self.assertRaises(ValueError, cli.dataset_path, "NOPE")
+        self.assertRaises(ValueError, cli.load_strategy, "starter", {"nope": 1}, 10)
+
+    def test_checkpoint(self):
+        def metrics(*argv):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                cli.main(["fixed_window", "ETH", "--json"] + list(argv))
+            return json.loads(output.getvalue())
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "eth.pkl")
+            width = ["--param", "lookback_tick_width=20"]
+            metrics(*width, "--end", "2020-01-20", "--checkpoint", path)
+            resumed = metrics(*width, "--end", "2020-02-01", "--checkpoint", path)
+            self.assertEqual(resumed, metrics(*width, "--end", "2020-02-01"))
+
+            # Other settings than those saved are refused
+            for argv in (["--param", "lookback_tick_width=30"], width + ["--capital", "50"]):
+                with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                    metrics(*argv, "--checkpoint", path)
@@ -0,0 +1,97 @@
+from unittest import TestCase, mock
+import concurrent.futures
+import os, sys, shutil, tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import dataset
+
+source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "USDT_ETH.csv")
+
+def rows(path):
+    return len(dataset.load(path))
+
+def append_and_load(path, n):
+    # Every append makes the next load rebuild the cache under the readers
+    for i in range(n):
+        with open(path, 'a') as f:
+            f.write("2021-02-01 00:00:00,1,2,3,{0},5\n".format(i))
+        dataset.load(path)
+    return n
+
+def load_many(path, n):
+    for _ in range(n):
+        frame = dataset.load(path, ['date', 'close'])
+        assert len(frame) >= 17569
+    return n
+
+class test_dataset(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "USDT_ETH.csv")
+        shutil.copy(source, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_matches_csv(self):
+        expected = pd.read_csv(self.path, parse_dates=[0])
+        result = dataset.load(self.path)
+        self.assertEqual(list(result.columns), list(expected.columns))
+        np.testing.assert_array_equal(result['close'], expected['close'])
+        np.testing.assert_array_equal(result['date'], expected['date'])
+
+    def test_date_range(self):
+        columns = dataset.load_columns(self.path, ['date', 'close'], start="2020-01-02", end="2020-01-02 23:59")
+        self.assertEqual(len(columns['close']), 48)
+        self.assertEqual(columns['date'][0], np.datetime64("2020-01-02T00:00"))
+        self.assertFalse(columns['close'].flags.writeable)
+
+    def test_rebuild(self):
+        dataset.load(self.path)
+        meta = os.path.join(dataset.cache_path(self.path), 'meta.json')
+        built = os.stat(meta).st_mtime_ns
+
+        # Touching without changing the contents keeps the cache
+        os.utime(self.path, ns=(built + 10**9, built + 10**9))
+        dataset.load(self.path)
+        self.assertEqual(len(dataset.load(self.path)), 17569)
+
+        with open(self.path, 'a') as f:
+            f.write("2021-01-01 00:30:00,1,2,3,4,5\n")
+        result = dataset.load(self.path)
+        self.assertEqual(len(result), 17570)
+        self.assertEqual(result['close'].iloc[-1], 4)
+
+    def test_iter_chunks(self):
+        chunks = list(dataset.iter_chunks(self.path, chunksize=5000, columns=['date', 'close']))
+        self.assertEqual([len(c) for c in chunks], [5000, 5000, 5000, 2569])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                      dataset.load(self.path, ['date', 'close']))
+
+    def test_concurrent_build(self):
+        with concurrent.futures.ProcessPoolExecutor(4) as pool:
+            self.assertEqual(list(pool.map(rows, [self.path] * 8)), [17569] * 8)
+
+    def test_append_while_building(self):
+        read_csv = pd.read_csv
+
+        def read_then_append(*args, **kwargs):
+            df = read_csv(*args, **kwargs)
+            with open(self.path, 'a') as f:
+                f.write("2021-01-01 00:30:00,1,2,3,4,5\n")
+            return df
+
+        with mock.patch.object(dataset.pd, 'read_csv', read_then_append):
+            self.assertEqual(len(dataset.load(self.path)), 17569)
+        # The appended bar was not in the build, so the cache is stale
+        self.assertEqual(len(dataset.load(self.path)), 17570)
+
+    def test_read_during_rebuild(self):
+        dataset.load(self.path)
+        with concurrent.futures.ProcessPoolExecutor(4) as pool:
+            futures = [pool.submit(append_and_load, self.path, 5)]
+            futures += [pool.submit(load_many, self.path, 30) for _ in range(3)]
+            self.assertEqual([f.result() for f in futures], [5, 30, 30, 30])
@@ -0,0 +1,234 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys, tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from gemini_modules import dataset, engine, metrics
+from momentum_algo import FixedWindowAlgo
+
+close = np.array([10, 11, 12, 11, 9, 8, 9, 10, 12, 13, 12, 10, 9, 11, 12], dtype=float)
+df = pd.DataFrame(
+    {
+        'date': pd.date_range("2020-01-01", periods=len(close), freq="30min"),
+        'low': close - 0.5,
+        'high': close + 0.5,
+        'open': close,
+        'close': close,
+        'volume': np.ones(len(close)),
+        }
+    )
+entry = np.array([0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0], dtype=bool)
+exit = np.array([0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0], dtype=bool)
+stop = np.where(entry, close - 1.5, 0)
+
+def signals(data):
+    return {'entry': entry, 'exit': exit, 'stop': stop}
+
+def logic(account, lookback):
+    today = len(lookback) - 1
+    price = lookback['close'][today]
+    if entry[today] and account.buying_power > 0:
+        account.enter_position('long', account.buying_power, price, stop_loss=stop[today])
+    if exit[today]:
+        for position in account.positions:
+            account.close_position(position, 1, price)
+
+class test_vectorized(TestCase):
+    def test_matches_loop(self):
+        backtest = engine.backtest(df)
+        expected = backtest.start(100, logic)
+        expected_trades = len(backtest.account.closed_trades)
+        result = backtest.start_vectorized(100, signals)
+
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(len(backtest.account.closed_trades), expected_trades)
+
+    def test_same_trades_and_metrics(self):
+        backtest = engine.backtest(df)
+        result = backtest.start(100, logic)
+        closed = backtest.account.closed_trades.to_frame()
+        expected = metrics.compute(result, backtest.account).to_series()
+        result = backtest.start_vectorized(100, signals)
+        # Stopped out trades are dated on the bar hitting the stop in both modes
+        pd.testing.assert_frame_equal(backtest.account.closed_trades.to_frame(), closed)
+        pd.testing.assert_series_equal(metrics.compute(result, backtest.account).to_series(), expected)
+
+    def test_matches_loop_on_data(self):
+        # All in entries leave rounding dust that must not be entered again
+        data = dataset.load(os.path.join(root, "data", "USDT_DOGE.csv"))
+        backtest = engine.backtest(data)
+        expected = backtest.start(100, FixedWindowAlgo(48, len(data), False).logic)
+        closed = backtest.account.closed_trades.to_frame()
+        opened = len(backtest.account.opened_trades)
+        result = backtest.start_vectorized(100, FixedWindowAlgo(48, len(data), False).signals)
+        pd.testing.assert_frame_equal(result, expected)
+        pd.testing.assert_frame_equal(backtest.account.closed_trades.to_frame(), closed)
+        self.assertEqual(len(backtest.account.opened_trades), opened)
+
+class test_portfolio(TestCase):
+    def test_shared_account(self):
+        other = df.copy()
+        other['close'] = other['close'] * 2
+        portfolio = engine.portfolio_backtest({'A': df, 'B': other[1:]})
+
+        def both(account, lookbacks):
+            if len(lookbacks['A']) == 1:
+                account.enter_position('long', 40, lookbacks['A'].close[-1], symbol='A')
+                account.enter_position('long', 40, lookbacks['B'].close[-1], symbol='B')
+
+        result = portfolio.start(100, both)
+        self.assertEqual(len(result), len(df) - 1)
+        self.assertEqual({p.symbol for p in portfolio.account.positions}, {'A', 'B'})
+        self.assertAlmostEqual(result['strategy_equity'].iloc[-1],
+                               20 + 40/11*12 + 40/22*24, places=5)
+        self.assertAlmostEqual(result['benchmark_equity'].iloc[-1],
+                               50/11*12 + 50/22*24)
+
+    def test_outer_join(self):
+        other = df.copy()
+        other['close'] = other['close'] * 2
+        portfolio = engine.portfolio_backtest({'A': df, 'B': other[3:]}, join='outer')
+        result = portfolio.start(100, lambda account, lookbacks: None)
+        self.assertEqual(len(result), len(df))
+        self.assertFalse(result['benchmark_equity'].isna().any())
+        # B is bought at its first close, its share is cash until then
+        np.testing.assert_allclose(result['benchmark_equity'][:3], 50/10*close[:3] + 50)
+        np.testing.assert_allclose(result['benchmark_equity'][3:], 50/10*close[3:] + 50/11*close[3:])
+
+    def test_requires_symbol(self):
+        portfolio = engine.portfolio_backtest({'A': df})
+
+        def unnamed(account, lookbacks):
+            account.enter_position('long', 10, lookbacks['A'].close[-1])
+        self.assertRaises(ValueError, portfolio.start, 100, unnamed)
+
+class test_profile(TestCase):
+    def test_phases(self):
+        backtest = engine.backtest(df)
+        self.assertRaises(ValueError, backtest.profile_results)
+        expected = backtest.start(100, logic)
+        self.assertIsNone(backtest.profile)
+
+        result = backtest.start(100, logic, profile=True)
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(list(backtest.profile.index), engine.PHASES + ['other'])
+        self.assertEqual(backtest.profile.loc['logic', 'calls'], len(df))
+        self.assertEqual(backtest.profile.loc['purge_positions', 'calls'], 2*len(df))
+        self.assertGreater(backtest.profile.attrs['bars_per_second'], 0)
+
+        # A vectorized run is not profiled
+        backtest.start_vectorized(100, signals)
+        self.assertIsNone(backtest.profile)
+
+class test_result_frame(TestCase):
+    def test_columns_and_returns(self):
+        backtest = engine.backtest(df)
+        result = backtest.start(100, logic)
+        self.assertEqual(list(result.columns), engine.RESULT_COLUMNS)
+        self.assertEqual(result.index.name, 'date')
+        np.testing.assert_array_equal(result['benchmark_equity'], close)
+        np.testing.assert_allclose(result['benchmark_return'][1:], close[1:]/close[:-1] - 1)
+        self.assertTrue(np.isnan(result['strategy_return'].iloc[0]))
+        np.testing.assert_array_equal(backtest.account.equity, result['strategy_equity'])
+        self.assertTrue(np.shares_memory(backtest.account.equity, result['strategy_equity'].to_numpy()))
+
+class test_stream(TestCase):
+    def test_matches_backtest(self):
+        backtest = engine.backtest(df)
+        expected = backtest.start(100, logic)
+
+        chunks = (df[i:i+4] for i in range(0, len(df), 4))
+        stream = engine.stream_backtest(chunks)
+        pd.testing.assert_frame_equal(stream.start(100, logic, max_lookback=1), expected)
+        self.assertEqual(len(stream.account.closed_trades), len(backtest.account.closed_trades))
+
+        rows = (row for _, row in df.iterrows())
+        result = engine.stream_backtest(rows).start(100, logic, max_lookback=1)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_without_history(self):
+        expected = engine.stream_backtest((row for _, row in df.iterrows())).start(100, logic, max_lookback=1)
+        seen = []
+        stream = engine.stream_backtest((row for _, row in df.iterrows()))
+        result = stream.start(100, logic, max_lookback=1, keep_history=False,
+                              on_bar=lambda date, close, equity: seen.append(equity))
+        self.assertIsNone(result)
+        np.testing.assert_array_equal(seen, expected['strategy_equity'])
+        self.assertEqual(stream.max_drawdown, metrics.drawdown(seen).min())
+        self.assertEqual(list(stream.account.equity), seen[-1:])
+        self.assertEqual(stream._tracker.shape[1], 1)
+        self.assertRaises(ValueError, stream.result)
+
+    def test_requires_max_lookback(self):
+        self.assertRaises(ValueError, engine.stream_backtest([]).start, 100, logic)
+
+class test_timeframe(TestCase):
+    def test_vectorized_matches_loop(self):
+        backtest = engine.backtest(df)
+        expected = backtest.start(100, FixedWindowAlgo(2, len(df), False, timeframe='1h').logic)
+        self.assertGreater(len(backtest.account.closed_trades), 0)
+        result = backtest.start_vectorized(100, FixedWindowAlgo(2, len(df), False, timeframe='1h').signals)
+        pd.testing.assert_frame_equal(result, expected)
+
+class test_checkpoint(TestCase):
+    def test_resume_matches_full_run(self):
+        full = engine.backtest(df)
+        expected = full.start(100, FixedWindowAlgo(2, len(df), False, timeframe='1h').logic)
+        algo = full.logic.__self__
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "state.pkl")
+            first = engine.backtest(df[:9])
+            first.start(100, FixedWindowAlgo(2, len(df), False, timeframe='1h').logic)
+            first.checkpoint(path)
+
+            resumed = engine.backtest(df)
+            result = resumed.resume(path)
+            pd.testing.assert_frame_equal(result, expected)
+            self.assertEqual(len(resumed.account.closed_trades), len(full.account.closed_trades))
+            self.assertEqual(resumed.logic.__self__.buypoints, algo.buypoints)
+            self.assertEqual(resumed.logic.__self__.sellpoints, algo.sellpoints)
+
+            # Module level logic is saved by name
+            first = engine.backtest(df[:6])
+            first.start(100, logic, profile=True)
+            first.checkpoint(path)
+            resumed = engine.backtest(df)
+            pd.testing.assert_frame_equal(resumed.resume(path, profile=True), full.start(100, logic))
+            self.assertEqual(resumed.profile.loc['logic', 'calls'], len(df) - 6)
+
+    def test_rejects_other_data(self):
+        self.assertRaises(ValueError, engine.backtest(df).checkpoint, "state.pkl")
+        # A vectorized run has no strategy state to save
+        backtest = engine.backtest(df)
+        backtest.start(100, logic)
+        backtest.start_vectorized(100, signals)
+        self.assertRaises(ValueError, backtest.checkpoint, "state.pkl")
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "state.pkl")
+            first = engine.backtest(df[:6])
+            first.start(100, logic)
+            first.checkpoint(path, {'capital': 100})
+            self.assertRaises(ValueError, engine.backtest(df).resume, path, labels={'capital': 50})
+            other = df.copy()
+            other.loc[5, 'close'] += 1
+            self.assertRaises(ValueError, engine.backtest(other).resume, path)
+            self.assertRaises(ValueError, engine.backtest(df[:5]).resume, path)
+
+class test_chart(TestCase):
+    def test_downsampled(self):
+        backtest = engine.backtest(df)
+        backtest.start(100, logic)
+        with tempfile.TemporaryDirectory() as folder:
+            p = backtest.chart(show_trades=True, points=5, show=False,
+                               filename=os.path.join(folder, "chart.html"))
+            self.assertTrue(os.path.isfile(os.path.join(folder, "chart.html")))
+        lines = [r.data_source.data for r in p.renderers if r.glyph.__class__.__name__ == 'Line']
+        self.assertEqual([len(data['y']) for data in lines], [5, 5])
+        markers = [r.data_source.data for r in p.renderers if r.glyph.__class__.__name__ == 'Scatter']
+        trades = len(backtest.account.opened_trades) + len(backtest.account.closed_trades)
+        self.assertEqual(sum(len(data['y']) for data in markers), trades)
+        self.assertRaises(ValueError, backtest.chart, downsample='every')
@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import exchange
+
+class test_position_book(TestCase):
+    def setUp(self):
+        self.account = exchange.Account(1000)
+        self.account.enter_position('long', 100, 10)
+        self.account.enter_position('short', 100, 20, stop_loss=25)
+        self.account.enter_position('long', 100, 5, stop_loss=4)
+
+    def test_views(self):
+        long, short, other = self.account.positions
+        self.assertIsInstance(long, exchange.LongPosition)
+        self.assertIsInstance(short, exchange.ShortPosition)
+        self.assertEqual(short.type_, 'short')
+        self.assertEqual(other.stop_loss, 4)
+        self.assertEqual([p.number for p in self.account.positions], [0, 1, 2])
+
+    def test_total_value(self):
+        expected = self.account.buying_power + 10*12 + 5*(20 - 12 + 20) + 20*12
+        self.assertAlmostEqual(self.account.total_value(12), expected)
+
+    def test_purge_reuses_slots(self):
+        long = self.account.positions[0]
+        self.account.close_position(long, 1.0, 11)
+        self.assertEqual(len(self.account.positions), 3)
+        self.account.purge_positions()
+        self.assertEqual([p.number for p in self.account.positions], [1, 2])
+
+        self.account.enter_position('long', 100, 10)
+        self.assertEqual(len(self.account.book.active), 16)
+        self.assertEqual(self.account.positions[-1]._slot, long._slot)
+        self.assertEqual([p.number for p in self.account.positions], [1, 2, 3])
+
+    def test_grow(self):
+        account = exchange.Account(10000)
+        for _ in range(40):
+            account.enter_position('long', 10, 1)
+        self.assertEqual(len(account.positions), 40)
+        self.assertAlmostEqual(account.total_value(2), account.buying_power + 800)
+
+    def test_triggered(self):
+        def triggered(low, high):
+            return [(p.number, price) for p, price in self.account.triggered_positions(low, high)]
+
+        self.assertEqual(triggered(6, 7), [])
+        self.assertEqual(triggered(3.5, 26), [(1, 26), (2, 3.5)])
+
+    def test_changed_levels(self):
+        def triggered(low, high):
+            return [(p.number, price) for p, price in self.account.triggered_positions(low, high)]
+
+        long, short, other = self.account.positions
+        other.stop_loss = 6
+        self.assertEqual(triggered(5.5, 7), [(2, 5.5)])
+        self.account.close_position(other, 1.0, 5.5)
+        self.account.purge_positions()
+
+        # The old stop of 4 is stale and ignored
+        long.exit_price = 15
+        short.exit_price = 18
+        self.assertEqual(triggered(3, 7), [(1, 18)])
+        self.assertEqual(triggered(16, 16), [(0, 15)])
+
+    def test_stop_wins_over_target(self):
+        position = self.account.positions[2]
+        position.exit_price = 6
+        self.assertEqual([(p.number, price) for p, price in self.account.triggered_positions(3, 7)],
+                         [(2, 3)])
+
+    def test_standalone_position(self):
+        position = exchange.LongPosition(0, 10, 2, 0.1)
+        self.assertEqual(position.close(0.5, 12), 12)
+        self.assertEqual(position.shares, 1)
+        self.assertEqual(position.fee, 0.1)
+
+class test_trade_ledger(TestCase):
+    def setUp(self):
+        self.account = exchange.Account(1000)
+        for day in range(100):
+            self.account.date = day
+            self.account.enter_position('long' if day % 4 else 'short', 5, 10)
+        for p in self.account.positions[:10]:
+            self.account.close_position(p, 0.5, 12)
+
+    def test_counts(self):
+        self.assertEqual(len(self.account.opened_trades), 100)
+        self.assertEqual(self.account.opened_trades.count('long'), 75)
+        self.assertEqual(self.account.opened_trades.count('short'), 25)
+        self.assertEqual(self.account.closed_trades.count('short'), 3)
+        self.assertEqual(self.account.closed_trades.count('cover'), 0)
+
+    def test_records(self):
+        trade = self.account.opened_trades[-1]
+        self.assertIsInstance(trade, exchange.OpenedTrade)
+        self.assertEqual((trade.type_, trade.date, trade.price), ('long', 99, 10))
+        closed = self.account.closed_trades[0]
+        self.assertEqual((closed.type_, closed.entry, closed.exit), ('short', 10, 12))
+        self.assertFalse(hasattr(closed, '__dict__'))
+        self.assertEqual(len(list(self.account.closed_trades)), 10)
+
+    def test_to_frame(self):
+        df = self.account.closed_trades.to_frame()
+        self.assertEqual(list(df.columns), ['date', 'type', 'symbol', 'shares', 'entry', 'exit', 'fee'])
+        self.assertEqual(len(df), 10)
+        self.assertEqual((df['type'] == 'long').sum(), 7)
+        self.assertTrue((df['exit'] == 12).all())
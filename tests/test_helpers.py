@@ -0,0 +1,31 @@
+from unittest import TestCase
+import numpy as np
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import helpers
+
+line = np.cumsum(np.random.default_rng(0).normal(size=10000))
+
+class test_downsample(TestCase):
+    def test_lttb(self):
+        rows = helpers.lttb(line, 100)
+        self.assertEqual(len(rows), 100)
+        self.assertEqual((rows[0], rows[-1]), (0, len(line) - 1))
+        self.assertTrue(np.all(np.diff(rows) > 0))
+        # The extremes make the largest triangles
+        self.assertIn(np.argmax(line), rows)
+        self.assertIn(np.argmin(line), rows)
+
+    def test_minmax(self):
+        rows = helpers.minmax(line, 50)
+        self.assertLessEqual(len(rows), 200)
+        self.assertEqual((rows[0], rows[-1]), (0, len(line) - 1))
+        for bucket in np.array_split(np.arange(len(line)), 50):
+            self.assertIn(bucket[np.argmax(line[bucket])], rows)
+            self.assertIn(bucket[np.argmin(line[bucket])], rows)
+
+    def test_short_lines_kept(self):
+        np.testing.assert_array_equal(helpers.lttb(line[:50], 100), np.arange(50))
+        np.testing.assert_array_equal(helpers.minmax(line[:50], 100), np.arange(50))
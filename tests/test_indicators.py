@@ -0,0 +1,77 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules.indicators import IndicatorCache, RollingMax, RollingMin
+from gemini_modules.lookback import Lookback
+
+values = pd.Series([5, 3, 4, 4, 8, np.nan, 2, 7, 1, 6, 6, 9, 0, 3], dtype=float)
+
+def stream(indicator):
+    result = []
+    for value in values:
+        indicator.update(value)
+        result.append(indicator.value)
+    return np.array(result)
+
+class test_rolling(TestCase):
+    def test_min(self):
+        for window in (1, 2, 3, 5):
+            np.testing.assert_array_equal(
+                stream(RollingMin("low", window)), values.rolling(window).min())
+
+    def test_max(self):
+        for window in (1, 2, 3, 5):
+            np.testing.assert_array_equal(
+                stream(RollingMax("high", window)), values.rolling(window).max())
+
+    def test_reset(self):
+        indicator = RollingMin("low", 2)
+        stream(indicator)
+        indicator.reset()
+        indicator.update(1.0)
+        self.assertTrue(np.isnan(indicator.value))
+
+class test_cache(TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({'low': values, 'high': values + 1})
+
+    def test_matches_pandas(self):
+        cache = IndicatorCache()
+        for function in ('min', 'max', 'mean', 'sum', 'std', 'median'):
+            np.testing.assert_array_equal(
+                cache.rolling(self.df, 'low', 3, function),
+                getattr(values.rolling(3), function)())
+
+    def test_lookback_shares_entry(self):
+        cache = IndicatorCache()
+        lookback = Lookback(self.df, end=5)
+        first = cache.rolling(lookback, 'low', 2, 'min')
+        self.assertEqual(len(first), 5)
+        lookback.advance()
+        second = cache.rolling(lookback, 'low', 2, 'min')
+        np.testing.assert_array_equal(second, values.rolling(2).min()[:6])
+        self.assertFalse(second.flags.writeable)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_eviction(self):
+        cache = IndicatorCache(max_bytes=2 * values.nbytes)
+        cache.rolling(self.df, 'low', 2, 'min')
+        cache.rolling(self.df, 'low', 3, 'min')
+        cache.rolling(self.df, 'low', 2, 'min')  # now most recently used
+        cache.rolling(self.df, 'high', 2, 'max')
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.rolling(self.df, 'low', 2, 'min')
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_dropped_with_dataset(self):
+        cache = IndicatorCache()
+        df = self.df.copy()
+        cache.rolling(df, 'low', 2, 'min')
+        del df
+        self.assertEqual(cache.stats()['entries'], 0)
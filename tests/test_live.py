@@ -0,0 +1,53 @@
+from unittest import TestCase
+import asyncio
+import os, sys, shutil, tempfile
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import engine, live
+from momentum_algo import FixedWindowAlgo
+
+data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+symbols = ["ETH", "XRP"]
+
+class test_paper_trader(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.frames = {}
+        for symbol in symbols:
+            df = pd.read_csv(os.path.join(data, "USDT_{0}.csv".format(symbol)), parse_dates=[0])[:400]
+            df.to_csv(os.path.join(self.folder, "USDT_{0}.csv".format(symbol)), index=False)
+            self.frames[symbol] = pd.read_csv(os.path.join(self.folder, "USDT_{0}.csv".format(symbol)), parse_dates=[0])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    async def replay(self, symbols):
+        server = await live.replay_server(self.folder)
+        port = server.sockets[0].getsockname()[1]
+        trader = live.paper_trader()
+        for symbol in symbols:
+            algo = FixedWindowAlgo(20, 0, False, symbol=symbol)
+            trader.add(symbol, live.replay_feed(symbol, port=port), algo.logic, 100)
+        try:
+            return trader, await trader.run()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    def test_matches_backtest(self):
+        trader, results = asyncio.run(self.replay(symbols))
+        for symbol in symbols:
+            df = self.frames[symbol]
+            expected = engine.backtest(df).start(100, FixedWindowAlgo(20, len(df), False, symbol=symbol).logic)
+            pd.testing.assert_frame_equal(results[symbol], expected, check_index_type=False)
+
+        latency = trader.latency()
+        self.assertEqual(list(latency.index), symbols)
+        self.assertEqual(list(latency['bars']), [400, 400])
+        self.assertTrue((latency['max'] >= latency['p50']).all())
+
+    def test_unknown_symbol(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.replay(["NOPE"]))
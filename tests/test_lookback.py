@@ -0,0 +1,99 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules.lookback import Lookback, RingLookback
+
+df = pd.DataFrame(
+    {
+        'date':[1,2,3,4,5,6,7,8,9,10],
+        'low': [1,2,3,4,5,6,7,8,9,10],
+        'high':[1,2,3,4,5,6,7,8,9,10],
+        'open':[1,2,3,4,5,6,7,8,9,10],
+        'close':[1,2,3,4,5,6,7,8,9,10],
+        'volume':[1,2,3,4,5,6,7,8,9,10],
+        }
+    )
+
+class test_lookback(TestCase):
+    def test_advance(self):
+        lookback = Lookback(df)
+        self.assertEqual(len(lookback), 0)
+        lookback.advance(3)
+        self.assertEqual(len(lookback), 3)
+        self.assertEqual(list(lookback.close), [1,2,3])
+        self.assertEqual(lookback['low'][2], 3)
+        self.assertRaises(IndexError, lookback.advance, 8)
+
+    def test_read_only(self):
+        lookback = Lookback(df, end=5)
+        with self.assertRaises(ValueError):
+            lookback.close[0] = 100
+        self.assertEqual(df['close'][0], 1)
+
+    def test_assigned_columns(self):
+        lookback = Lookback(df, end=5)
+        lookback['Support'] = lookback['low'].rolling(window=2).min()
+        self.assertEqual(lookback['Support'][4], 4)
+        self.assertIn('Support', lookback.columns)
+        lookback.advance()
+        self.assertNotIn('Support', lookback)
+
+class test_ring_lookback(TestCase):
+    def test_wraps(self):
+        lookback = RingLookback(3)
+        for i, row in df.iterrows():
+            lookback.append(row.to_dict())
+            self.assertEqual(len(lookback), i + 1)
+            self.assertEqual(list(lookback.close), list(df['close'][max(i - 2, 0):i + 1]))
+        self.assertEqual(lookback.start, 7)
+        self.assertEqual(lookback['close'][9], 10)
+        self.assertEqual(list(lookback.index), [7, 8, 9])
+        with self.assertRaises(ValueError):
+            lookback.close[0] = 100
+
+    def test_assigned_columns(self):
+        lookback = RingLookback(2)
+        for i in range(5):
+            lookback.append(df.iloc[i].to_dict())
+        lookback['Support'] = 0
+        self.assertEqual(list(lookback['Support'].index), [3, 4])
+        lookback.append(df.iloc[5].to_dict())
+        self.assertNotIn('Support', lookback)
+
+class test_timeframe(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        close = 100 + np.cumsum(rng.normal(size=50))
+        self.bars = pd.DataFrame({
+            'date': pd.date_range("2020-01-01 01:00", periods=50, freq="30min"),
+            'low': close - 1, 'high': close + 1, 'open': close, 'close': close,
+            'volume': rng.random(50)})
+
+    def expected(self, rows, freq):
+        return self.bars[:rows].resample(freq, on='date').agg(
+            {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+
+    def test_matches_resample(self):
+        lookback = Lookback(self.bars)
+        for rows in range(1, 51):
+            lookback.advance()
+            if rows % 7 == 0 or rows == 50:
+                for freq in ('2h', '1D'):
+                    bars = lookback.timeframe(freq).to_frame().set_index('date')
+                    expected = self.expected(rows, freq)
+                    np.testing.assert_allclose(bars.to_numpy(), expected.to_numpy())
+                    self.assertTrue((bars.index == expected.index).all())
+
+    def test_ring(self):
+        lookback = RingLookback(1)
+        for rows in range(1, 51):
+            lookback.append(self.bars.iloc[rows - 1].to_dict())
+            bars = lookback.timeframe('4h')
+        self.assertEqual(len(bars), 7)
+        np.testing.assert_allclose(bars.to_frame().set_index('date').to_numpy(),
+                                   self.expected(50, '4h').to_numpy())
+        self.assertRaises(ValueError, Lookback(df).timeframe, '1M')
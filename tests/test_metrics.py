@@ -0,0 +1,77 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from gemini_modules import engine, metrics
+
+close = np.array([10, 11, 12, 11, 9, 8, 9, 10, 12, 13, 12, 10, 9, 11, 12], dtype=float)
+df = pd.DataFrame(
+    {
+        'date': pd.date_range("2020-01-01", periods=len(close), freq="30min"),
+        'low': close - 0.5,
+        'high': close + 0.5,
+        'open': close,
+        'close': close,
+        'volume': np.ones(len(close)),
+        }
+    )
+
+def logic(account, lookback):
+    today = len(lookback) - 1
+    price = lookback['close'][today]
+    if today in (1, 5) and account.buying_power > 0:
+        account.enter_position('long', account.buying_power, price)
+    if today in (4, 9):
+        for position in account.positions:
+            account.close_position(position, 1, price)
+
+class test_compute(TestCase):
+    def setUp(self):
+        self.backtest = engine.backtest(df)
+        self.result = self.backtest.start(100, logic)
+        self.metrics = metrics.compute(self.result, self.backtest.account)
+
+    def test_returns(self):
+        equity = self.result['strategy_equity'].to_numpy()
+        returns = equity[1:]/equity[:-1] - 1
+        scale = np.sqrt(365*48)
+        self.assertAlmostEqual(self.metrics.total_return, equity[-1]/100 - 1)
+        self.assertAlmostEqual(self.metrics.sharpe, returns.mean()/returns.std(ddof=1)*scale)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0)**2))
+        self.assertAlmostEqual(self.metrics.sortino, returns.mean()/downside*scale)
+
+    def test_drawdown(self):
+        equity = self.result['strategy_equity']
+        self.assertAlmostEqual(self.metrics.max_drawdown, (equity/equity.cummax() - 1).min())
+        # Below the peak of bar 2 until bar 8
+        self.assertEqual(self.metrics.max_drawdown_duration, 5)
+
+    def test_trades(self):
+        self.assertEqual(self.metrics.round_trips, 2)
+        self.assertAlmostEqual(self.metrics.pnl, self.result['strategy_equity'].iloc[-1] - 100)
+        self.assertEqual(self.metrics.win_rate, 0.5)
+        # Held on bars 2-4 and 6-9
+        self.assertAlmostEqual(self.metrics.exposure, 7/len(df))
+        self.assertEqual(set(self.metrics.to_dict()), set(metrics.Metrics.FIELDS))
+
+class test_rolling(TestCase):
+    def test_max_drawdown(self):
+        equity = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 500)))
+        expected = [np.nan]*9 + [(equity[i-9:i+1]/np.maximum.accumulate(equity[i-9:i+1]) - 1).min()
+                                 for i in range(9, 500)]
+        metrics.BLOCK_SIZE, size = 64, metrics.BLOCK_SIZE
+        try:
+            np.testing.assert_allclose(metrics.rolling_max_drawdown(equity, 10), expected)
+        finally:
+            metrics.BLOCK_SIZE = size
+
+    def test_columns(self):
+        result = engine.backtest(df).start(100, logic)
+        rolled = metrics.rolling(result, 5)
+        self.assertEqual(list(rolled.columns), ['return', 'volatility', 'sharpe', 'sortino', 'max_drawdown'])
+        self.assertTrue(rolled.index.equals(result.index))
+        equity = result['strategy_equity']
+        self.assertAlmostEqual(rolled['return'].iloc[-1], equity.iloc[-1]/equity.iloc[-5] - 1)
@@ -0,0 +1,38 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys, tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+from matplotlib.figure import Figure
+from gemini_modules import engine
+from momentum_algo import FixedWindowAlgo
+
+rng = np.random.default_rng(0)
+close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 5000)))
+df = pd.DataFrame({
+    'date': pd.date_range("2020-01-01", periods=len(close), freq="30min"),
+    'low': close * 0.99, 'high': close * 1.01, 'open': close, 'close': close,
+    'volume': np.ones(len(close))})
+
+class test_render(TestCase):
+    def setUp(self):
+        self.algo = FixedWindowAlgo(20, len(df), False)
+        engine.backtest(df).start_vectorized(100, self.algo.signals)
+
+    def test_decimated(self):
+        ax = Figure().subplots()
+        self.algo.draw(ax, df, max_points=400)
+        self.assertEqual(len(ax.get_lines()), 5)
+        for line in ax.get_lines():
+            self.assertLessEqual(len(line.get_xdata()), 400)
+        # The highs and lows survive decimation
+        prices = ax.get_lines()[0].get_ydata()
+        self.assertEqual((prices.min(), prices.max()), (close[:-1].min(), close[:-1].max()))
+        self.assertEqual(list(df.columns), ['date', 'low', 'high', 'open', 'close', 'volume'])
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = self.algo.render(df, os.path.join(folder, "chart.png"))
+            self.assertGreater(os.path.getsize(filename), 0)
@@ -0,0 +1,57 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+import robustness
+from momentum_algo import FixedWindowAlgo
+
+data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "USDT_ETH.csv")
+
+rng = np.random.default_rng(0)
+close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+df = pd.DataFrame({
+    'date': pd.date_range("2020-01-01", periods=len(close), freq="30min"),
+    'low': close * 0.99, 'high': close * 1.02, 'open': close * 1.01, 'close': close,
+    'volume': rng.random(len(close))})
+
+class test_bootstrap(TestCase):
+    def test_blocks(self):
+        paths = robustness.bootstrap_paths(df, 3, block=10, rng=1)
+        self.assertEqual(paths['close'].shape, (3, 200))
+        np.testing.assert_array_equal(paths['close'][:, 0], close[0])
+        # Every bar keeps its shape around the close
+        np.testing.assert_allclose(paths['high'] / paths['close'], 1.02)
+        np.testing.assert_allclose(paths['low'] / paths['close'], 0.99)
+        # and the moves are those of the data, a block at a time
+        moves = paths['close'][:, 1:] / paths['close'][:, :-1]
+        original = close[1:] / close[:-1]
+        rows = np.abs(moves[..., None] - original).argmin(axis=2)
+        np.testing.assert_allclose(moves, original[rows])
+        self.assertTrue(np.all((np.diff(rows[:, :10]) == 1) | (np.diff(rows[:, :10]) == -198)))
+
+    def test_seeded(self):
+        first = robustness.bootstrap_paths(df, 2, rng=5)
+        second = robustness.bootstrap_paths(df, 2, rng=5)
+        np.testing.assert_array_equal(first['close'], second['close'])
+
+    def test_fee_noise(self):
+        draws = robustness.fee_draws(100, {'long': 0.001}, noise=0.5, rng=0)
+        rates = np.array([d['long'] for d in draws])
+        self.assertGreater(rates.std(), 0)
+        self.assertAlmostEqual(np.median(rates), 0.001, delta=0.0002)
+        self.assertEqual(robustness.fee_draws(2, {'long': 0.001}), [{'long': 0.001}]*2)
+        # Noise on no fees would silently do nothing
+        self.assertRaises(ValueError, robustness.fee_draws, 3, {}, noise=0.5)
+
+class test_monte_carlo(TestCase):
+    def test_reproducible(self):
+        kwargs = dict(n_paths=4, batch_size=2, fees={'long': 0.001}, fee_noise=0.2, max_workers=2)
+        results = robustness.monte_carlo(FixedWindowAlgo, {'lookback_tick_width': 145}, data, **kwargs)
+        self.assertEqual(list(results['path']), [0, 1, 2, 3])
+        self.assertTrue((results['max_drawdown'] <= 0).all())
+        again = robustness.monte_carlo(FixedWindowAlgo, {'lookback_tick_width': 145}, data, **kwargs)
+        pd.testing.assert_frame_equal(results, again)
+        self.assertEqual(list(robustness.distribution(results).index)[-2:], ['mean', 'std'])
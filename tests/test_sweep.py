@@ -0,0 +1,35 @@
+from unittest import TestCase
+import os, sys, shutil, tempfile
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+import sweep
+from gemini_modules import dataset, engine
+from momentum_algo import FixedWindowAlgo
+
+source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "USDT_ETH.csv")
+
+class test_sweep(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "USDT_ETH.csv")
+        pd.read_csv(source)[:600].to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_matches_backtest(self):
+        results = sweep.sweep(FixedWindowAlgo, [self.path], max_workers=2,
+                              lookback_tick_width=[40, 20])
+        self.assertTrue(os.path.isdir(dataset.cache_path(self.path)))
+        self.assertEqual(list(results['asset']), ["USDT_ETH"] * 2)
+        self.assertEqual(list(results['lookback_tick_width']), [20, 40])
+
+        df = dataset.load(self.path)
+        for _, row in results.iterrows():
+            algo = FixedWindowAlgo(row['lookback_tick_width'], len(df), False)
+            backtest = engine.backtest(df)
+            backtest.start(100, algo.logic)
+            self.assertEqual(row['final_equity'], backtest.account.total_value(df['close'].iloc[-1]))
+            self.assertEqual(row['longs'], backtest.account.opened_trades.count('long'))
@@ -0,0 +1,62 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+
+import os, sys, shutil, tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Adding the above directory to the path
+
+import walk_forward as wf
+from gemini_modules import dataset, engine
+from momentum_algo import FixedWindowAlgo
+
+rng = np.random.default_rng(3)
+close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+df = pd.DataFrame({
+    'date': pd.date_range("2020-01-01", periods=len(close), freq="30min"),
+    'low': close * 0.99, 'high': close * 1.01, 'open': close, 'close': close,
+    'volume': np.ones(len(close))})
+
+class test_folds(TestCase):
+    def test_rolling(self):
+        self.assertEqual(wf.make_folds(10, 4, 2), [(0, 4, 6), (2, 6, 8), (4, 8, 10)])
+
+    def test_step(self):
+        self.assertEqual(wf.make_folds(10, 4, 2, step=3), [(0, 4, 6), (3, 7, 9)])
+
+    def test_too_short(self):
+        self.assertEqual(wf.make_folds(5, 4, 2), [])
+
+class test_walk_forward(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "USDT_TEST.csv")
+        df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_selection(self):
+        candidates = [{'lookback_tick_width': w} for w in (5, 10, 20)]
+        folds = wf.make_folds(len(df), 200, 100)
+        results = wf.walk_forward(FixedWindowAlgo, self.path, candidates, 200, 100, max_workers=2)
+        self.assertEqual(list(results['fold']), list(range(len(folds))))
+
+        scores = np.array([wf.evaluate_candidate(FixedWindowAlgo, params, self.path, folds)
+                           for params in candidates])
+        data = dataset.load(self.path)
+        for fold, (train_start, train_stop, test_stop) in enumerate(folds):
+            best = np.nanargmax(scores[:, fold, 0])
+            row = results.iloc[fold]
+            self.assertEqual(row['lookback_tick_width'], candidates[best]['lookback_tick_width'])
+            self.assertEqual(row['train_score'], scores[best, fold, 0])
+
+            # The test score is a backtest of the test rows alone
+            signals = FixedWindowAlgo(total_df_length=len(data), should_plot=False,
+                                      **candidates[best]).signals(data)
+            window = {name: np.asarray(values)[train_stop:test_stop]
+                      for name, values in signals.items() if values is not None}
+            result = engine.backtest(data.iloc[train_stop:test_stop]).start_vectorized(100, lambda d: window)
+            equity = result['strategy_equity']
+            self.assertAlmostEqual(row['test_score'], equity.iloc[-1] / equity.iloc[0] - 1)
+        # The choice changes between folds, so the selection is exercised
+        self.assertGreater(len(set(results['lookback_tick_width'])), 1)
@@ -0,0 +1,125 @@
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+# local imports
+from gemini_modules import engine
+from sweep import asset_name, init_worker, load_dataset
+
+
+def make_folds(n: int, train: int, test: int, step=None) -> list:
+    """Rolling (train_start, train_stop, test_stop) row ranges.
+    Each test window starts where its train window stops, and the windows
+    move forward by step rows, the test length by default."""
+    step = test if step is None else step
+    folds = []
+    start = 0
+    while start + train + test <= n:
+        folds.append((start, start + train, start + train + test))
+        start += step
+    return folds
+
+
+def final_return(result: pd.DataFrame) -> float:
+    """Default selection metric, the strategy's return over the window."""
+    equity = result["strategy_equity"].to_numpy()
+    return equity[-1] / equity[0] - 1
+
+
+def evaluate_candidate(algo_class, params: dict, path: str, folds: list,
+                       initial_capital: float = 100, metric=final_return) -> list:
+    """Scores one parameter set on the train and test window of every fold.
+
+    The strategy's signals are computed once over the whole dataset and
+    sliced per window, so overlapping folds share their rolling indicators
+    and every window starts with them already warmed up."""
+    df = load_dataset(path)
+    algo = algo_class(total_df_length=len(df), should_plot=False, **params)
+    signals = algo.signals(df)
+
+    def window_score(start, stop):
+        window = {name: np.asarray(values)[start:stop]
+                  for name, values in signals.items() if values is not None}
+        backtest = engine.backtest(df.iloc[start:stop])
+        result = backtest.start_vectorized(initial_capital, lambda data: window)
+        return metric(result)
+
+    return [(window_score(train_start, train_stop),
+             window_score(train_stop, test_stop))
+            for train_start, train_stop, test_stop in folds]
+
+
+def walk_forward(algo_class, path: str, candidates: list, train: int, test: int,
+                 step=None, initial_capital: float = 100, metric=final_return,
+                 max_workers=None) -> pd.DataFrame:
+    """Walk-forward optimisation of a strategy on one dataset.
+
+    :param algo_class: Strategy class with a signals method, e.g. FixedWindowAlgo
+    :param path: Dataset to split into folds
+    :param candidates: Parameter dicts to choose from on each train window,
+        e.g. [{"lookback_tick_width": w} for w in range(10, 500, 5)]
+    :param train: Rows in each train window
+    :param test: Rows in each test window
+    :param step: Rows between folds, defaults to test
+    :param metric: Function scoring a backtest result frame, higher is better
+
+    Candidates run in parallel on a process pool, each one scoring every
+    fold in turn. Folds are deliberately not split across tasks: a
+    candidate's signals are computed once over the whole dataset and
+    sliced per fold, which splitting would repeat, and a realistic list of
+    candidates already keeps every worker busy. Loading the dataset here
+    builds its cache before the workers read it. Returns one row per fold
+    with the best candidate on its train window and that candidate's score
+    on the following test window.
+    """
+    df = load_dataset(path)
+    folds = make_folds(len(df), train, test, step)
+    if len(folds) == 0:
+        raise ValueError("Dataset is too short for a single train and test window")
+
+    scores = [None] * len(candidates)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker) as pool:
+        futures = {
+            pool.submit(evaluate_candidate, algo_class, params, path, folds,
+                        initial_capital, metric): i
+            for i, params in enumerate(candidates)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            scores[futures[future]] = future.result()
+
+    # scores[candidate][fold] = (train score, test score)
+    scores = np.array(scores, dtype=float)
+    best = np.nanargmax(scores[:, :, 0], axis=0)
+
+    dates = df["date"]
+    rows = []
+    for fold, (train_start, train_stop, test_stop) in enumerate(folds):
+        row = {
+            "asset": asset_name(path),
+            "fold": fold,
+            "train_start": dates.iloc[train_start],
+            "test_start": dates.iloc[train_stop],
+            "test_end": dates.iloc[test_stop - 1],
+        }
+        row.update(candidates[best[fold]])
+        row["train_score"] = scores[best[fold], fold, 0]
+        row["test_score"] = scores[best[fold], fold, 1]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    from momentum_algo import FixedWindowAlgo
+
+    results = walk_forward(
+        FixedWindowAlgo,
+        "data/USDT_BTC.csv",
+        candidates=[{"lookback_tick_width": w} for w in range(10, 500, 5)],
+        train=48 * 60,  # 60 days of 30 minute bars
+        test=48 * 14,
+    )
+    print(results)
+    print("Out of sample return: {0:.2%}".format(
+        (results["test_score"] + 1).prod() - 1))